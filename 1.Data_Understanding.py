@@ -1,10 +1,13 @@
+import warnings
+
+import numpy as np
 import pandas as pd
 
-def load_dataset(file_path):
-    """
-    Load the dataset from a CSV file.
-    """
-    return pd.read_csv(file_path)
+import sketches
+from column_profiler import (DESCRIBE_INDEX, MAX_NUMERIC_VALUE_COUNTS, is_categorical, is_numerical,
+                            merge_dataset_sketches, merge_dtypes, profile_dataframe, profile_from_sketches,
+                            sketch_dataframe, update_numeric_value_counts)
+from data_loader import load_dataset, iter_chunks
 
 def display_first_rows(df, num_rows=5):
     """
@@ -13,54 +16,166 @@ def display_first_rows(df, num_rows=5):
     print("First {} rows of the dataset:".format(num_rows))
     print(df.head(num_rows))
 
-def get_overview(df):
+def get_overview(df, profile=None):
     """
     Get an overview of the dataset.
     """
+    if profile is None:
+        profile = profile_dataframe(df)
     print("\nDataset Overview:")
-    print("Number of rows: {}".format(df.shape[0]))
-    print("Number of columns: {}".format(df.shape[1]))
+    print("Number of rows: {}".format(profile['n_rows']))
+    print("Number of columns: {}".format(len(profile['columns'])))
     print("Column names:")
-    print(df.columns.tolist())
+    print(profile['columns'])
     print("\nData types:")
-    print(df.dtypes)
+    print(profile['dtypes'])
 
-def summarize_features(df):
+def summarize_features(df, profile=None):
     """
     Summarize key features of the dataset.
     """
+    if profile is None:
+        profile = profile_dataframe(df)
     print("\nSummary of numerical features:")
-    print(df.describe())
+    print(profile['describe'])
     
     print("\nSummary of categorical features:")
-    for column in df.select_dtypes(include=['object', 'category']).columns:
+    for column, counts in profile['value_counts'].items():
         print("\nColumn: {}".format(column))
-        print(df[column].value_counts())
+        print(counts)
 
-def check_missing_values(df):
+def check_missing_values(df, profile=None):
     """
     Check for missing values in the dataset.
     """
+    if profile is None:
+        profile = profile_dataframe(df)
     print("\nMissing values in the dataset:")
-    missing_values = df.isnull().sum()
+    missing_values = profile['missing']
     print(missing_values[missing_values > 0])
 
+def profile_in_chunks(file_path, chunksize=100000, rank_error=0.013, approximate=False):
+    """
+    Profile the dataset in a single streaming pass over chunks of at most `chunksize` rows.
+    Row and column counts, dtypes, missing counts, count/mean/std/min/max and categorical value counts are exact.
+    Quartiles are estimated with a quantile sketch of about `rank_error` normalized rank error.
+    With `approximate`, each chunk is summarised with sketch_dataframe and the sketches are merged, so value counts
+    are also bounded in memory (top values only) and distinct counts are estimated.
+    A column read as numbers in some chunks and as text in others is reported as text, with a warning; its value
+    counts include the numeric chunks unless those had more than MAX_NUMERIC_VALUE_COUNTS distinct values.
+    Returns a profile in the same layout as profile_dataframe, plus the first rows under 'head'.
+    """
+    state = {'head': None, 'n_rows': 0, 'dtypes': {}, 'missing': {}, 'numeric': {}, 'value_counts': {},
+             'numeric_value_counts': {}, 'changed': set()}
+    dataset_sketch = None
+
+    for chunk in iter_chunks(file_path, chunksize=chunksize):
+        if state['head'] is None:
+            state['head'] = chunk.head(5)
+
+        if approximate:
+            chunk_sketch = sketch_dataframe(chunk, rank_error=rank_error)
+            dataset_sketch = chunk_sketch if dataset_sketch is None else merge_dataset_sketches(dataset_sketch, chunk_sketch)
+            continue
+
+        state['n_rows'] += len(chunk)
+        for column in chunk.columns:
+            values = chunk[column]
+            dtype = merge_dtypes(state['dtypes'].get(column, values.dtype), values.dtype)
+            if is_numerical(state['dtypes'].get(column, dtype)) != is_numerical(dtype) and column not in state['changed']:
+                warnings.warn("Column {} is read as numbers in some chunks and as text in others; "
+                              "it is profiled as text.".format(column))
+                state['changed'].add(column)
+            state['dtypes'][column] = dtype
+            state['missing'][column] = state['missing'].get(column, 0) + int(values.isnull().sum())
+
+            if is_numerical(values):
+                update_numeric_stats(state['numeric'], column, values, rank_error)
+                update_numeric_value_counts(state['numeric_value_counts'], column, values)
+            elif is_categorical(values):
+                counts = values.value_counts()
+                previous = state['value_counts'].get(column)
+                state['value_counts'][column] = counts if previous is None else previous.add(counts, fill_value=0)
+
+    if approximate:
+        profile = profile_from_sketches(dataset_sketch)
+        profile['head'] = state['head']
+        return profile
+    return finalize_chunked_profile(state)
+
+def update_numeric_stats(stats, column, values, rank_error):
+    """
+    Fold one chunk of a numerical column into its running moments and quantile sketch.
+    """
+    x = values.to_numpy(dtype='float64', na_value=np.nan)
+    if column not in stats:
+        stats[column] = {'moments': sketches.new_moments(), 'quantiles': sketches.new_quantile_sketch(rank_error)}
+    stats[column]['moments'] = sketches.update_moments(stats[column]['moments'], x)
+    sketches.update_quantile_sketch(stats[column]['quantiles'], x)
+
+def finalize_chunked_profile(state):
+    """
+    Turn the streamed running statistics into a profile the reporting functions can render.
+    """
+    dtypes = pd.Series(state['dtypes'], dtype='object')
+    numerical_columns = [column for column in state['numeric'] if is_numerical(dtypes[column])]
+    categorical_columns = [column for column in state['value_counts'] if column not in numerical_columns]
+
+    # Columns read as numbers in some chunks and as text in others: count the numeric chunks' values as text
+    value_counts = dict(state['value_counts'])
+    for column in categorical_columns:
+        if column not in state['numeric_value_counts']:
+            continue
+        numeric_counts = state['numeric_value_counts'][column]
+        if numeric_counts is None:
+            warnings.warn("Value counts of column {} leave out the chunks read as numbers, which had more than {} "
+                          "distinct values.".format(column, MAX_NUMERIC_VALUE_COUNTS))
+        else:
+            value_counts[column] = value_counts[column].add(numeric_counts, fill_value=0)
+
+    summary = {}
+    for column in numerical_columns:
+        moments = state['numeric'][column]['moments']
+        count = moments['count']
+        std = np.sqrt(moments['m2'] / (count - 1)) if count > 1 else np.nan
+        low, q25, q50, q75, high = sketches.query_quantiles(state['numeric'][column]['quantiles'], [0, 0.25, 0.5, 0.75, 1])
+        summary[column] = [float(count), moments['mean'] if count else np.nan, std, low, q25, q50, q75, high]
+
+    return {
+        'head': state['head'],
+        'n_rows': state['n_rows'],
+        'columns': dtypes.index.tolist(),
+        'dtypes': dtypes,
+        'missing': pd.Series(state['missing'], dtype='int64'),
+        'describe': pd.DataFrame(summary, index=DESCRIBE_INDEX),
+        'value_counts': {column: value_counts[column].astype('int64').sort_values(ascending=False, kind='stable')
+                         for column in categorical_columns},
+        'numerical_columns': numerical_columns,
+        'categorical_columns': categorical_columns,
+    }
+
 # Main function to execute the EDA tasks
-def main(file_path):
-    # Load the dataset
-    df = load_dataset(file_path)
+def main(file_path, chunksize=None, approximate=False, optimize=False):
+    # Profile the dataset out of core when a chunk size is given
+    if chunksize is not None:
+        profile = profile_in_chunks(file_path, chunksize=chunksize, approximate=approximate)
+        df = profile['head']
+    else:
+        # Load the dataset and profile every column once, with sketches when `approximate`
+        df = load_dataset(file_path, optimize=optimize)
+        profile = profile_dataframe(df, approximate=approximate)
     
     # Display the first few rows
     display_first_rows(df)
     
     # Get an overview of the dataset
-    get_overview(df)
+    get_overview(df, profile)
     
     # Summarize key features
-    summarize_features(df)
+    summarize_features(df, profile)
     
     # Check for missing values
-    check_missing_values(df)
+    check_missing_values(df, profile)
 
 # Example usage:
 if __name__ == "__main__":
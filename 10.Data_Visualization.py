@@ -1,67 +1,66 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+from batch_rendering import render_batch
+from data_loader import load_dataset
+from distribution_summaries import distribution_summaries
+from plotting import (box_plots_figure, correlation_heatmap_figure, finish_figure, histograms_figure, scatter_figure,
+                      violin_figure)
 
-def load_dataset(file_path):
-    """
-    Load the dataset from a CSV file.
-    """
-    return pd.read_csv(file_path)
-
-def plot_histograms(df):
+def plot_histograms(df, output_path=None):
     """
     Plot histograms for numerical variables.
     """
-    numerical_columns = df.select_dtypes(include=['number']).columns
-    df[numerical_columns].hist(figsize=(15, 15), bins=20, edgecolor='black')
-    plt.suptitle('Histograms of Numerical Features', fontsize=20)
-    plt.show()
+    finish_figure(histograms_figure(df), output_path)
 
-def plot_box_plots(df):
+def plot_box_plots(df, output_path=None):
     """
     Plot box plots for numerical variables.
     """
-    numerical_columns = df.select_dtypes(include=['number']).columns
-    plt.figure(figsize=(15, 10))
-    df[numerical_columns].boxplot()
-    plt.title('Box plots of Numerical Features', fontsize=20)
-    plt.xticks(rotation=90)
-    plt.show()
+    finish_figure(box_plots_figure(df), output_path)
 
-def plot_scatter_plots(df, x_column, y_column):
+def plot_scatter_plots(df, x_column, y_column, output_path=None):
     """
     Plot scatter plots for pairs of numerical variables.
     """
-    plt.figure(figsize=(10, 7))
-    sns.scatterplot(x=x_column, y=y_column, data=df)
-    plt.title(f'Scatter Plot of {x_column} vs {y_column}', fontsize=15)
-    plt.show()
+    finish_figure(scatter_figure(df, x_column, y_column), output_path)
 
-def plot_correlation_heatmap(df):
+def plot_correlation_heatmap(df, output_path=None, top_k=None):
     """
     Plot a correlation heatmap for numerical variables.
     """
-    numerical_columns = df.select_dtypes(include=['number']).columns
-    correlation_matrix = df[numerical_columns].corr()
-    
-    plt.figure(figsize=(12, 10))
-    sns.heatmap(correlation_matrix, annot=True, fmt='.2f', cmap='coolwarm', square=True, linewidths=.5)
-    plt.title('Correlation Heatmap', fontsize=20)
-    plt.show()
+    finish_figure(correlation_heatmap_figure(df, top_k), output_path)
 
-def plot_violin_plots(df, categorical_column, numerical_column):
+def plot_violin_plots(df, categorical_column, numerical_column, output_path=None):
     """
     Plot violin plots for numerical variables across different categories.
     """
-    plt.figure(figsize=(12, 6))
-    sns.violinplot(x=categorical_column, y=numerical_column, data=df, palette='viridis')
-    plt.title(f'Violin Plot of {numerical_column} by {categorical_column}', fontsize=15)
-    plt.xticks(rotation=45)
-    plt.show()
+    finish_figure(violin_figure(df, categorical_column, numerical_column), output_path)
+
+def list_plot_tasks(df):
+    """
+    Every plot of the visualization run, as (kind, arguments) pairs for the batch renderer.
+    """
+    numerical_columns = df.select_dtypes(include=['number']).columns
+    categorical_columns = df.select_dtypes(include=['object', 'category']).columns
 
-def main(file_path):
-    # Load the dataset
-    df = load_dataset(file_path)
+    tasks = [('histograms', {}), ('box_plots', {})]
+    for i in range(len(numerical_columns)):
+        for j in range(i + 1, len(numerical_columns)):
+            tasks.append(('scatter', {'x_column': numerical_columns[i], 'y_column': numerical_columns[j]}))
+    tasks.append(('correlation_heatmap', {}))
+    for num_col in numerical_columns:
+        for cat_col in categorical_columns:
+            tasks.append(('violin', {'categorical_column': cat_col, 'numerical_column': num_col}))
+    return tasks
+
+def main(file_path, output_dir=None, n_jobs=None, optimize=False):
+    # Load the dataset, with compact dtypes when `optimize`
+    df = load_dataset(file_path, optimize=optimize)
+    
+    # Render every plot to image files in parallel, without a GUI, when an output directory is given
+    if output_dir is not None:
+        # Summarise distributions before the workers start, so they find the summaries already cached
+        distribution_summaries(df)
+        render_batch(df, list_plot_tasks(df), output_dir, n_jobs=n_jobs)
+        return
     
     # Plot histograms for numerical variables
     plot_histograms(df)
@@ -1,58 +1,119 @@
-import pandas as pd
-import scipy.stats as stats
 import numpy as np
 
-def load_dataset(file_path):
-    """
-    Load the dataset from a CSV file.
-    """
-    return pd.read_csv(file_path)
+from data_loader import load_dataset
+from hypothesis_tests import batch_chi_square_tests, batch_correlation_tests, batch_t_tests
+from resampling import bootstrap, permutation_test, statistic_inputs
 
 def t_test(df, group_col, value_col):
     """
     Perform a t-test to compare the means of two groups.
     """
-    groups = df[group_col].unique()
+    groups = df[group_col].dropna().unique()
     if len(groups) != 2:
         print(f"T-test requires exactly 2 groups. Found {len(groups)} groups in {group_col}.")
         return
     
-    group1 = df[df[group_col] == groups[0]][value_col]
-    group2 = df[df[group_col] == groups[1]][value_col]
-    
-    t_stat, p_value = stats.ttest_ind(group1, group2, nan_policy='omit')
+    results = batch_t_tests(df, [group_col], [value_col])
+    # No row when a group has no values to compare
+    t_stat, p_value = (results.iloc[0]['t_statistic'], results.iloc[0]['p_value']) if len(results) else (np.nan, np.nan)
     print(f"T-test between {groups[0]} and {groups[1]} for {value_col}:")
     print(f"T-statistic: {t_stat:.4f}, P-value: {p_value:.4f}\n")
 
+def t_tests(df, group_columns=None, value_columns=None, equal_var=True, alpha=0.05):
+    """
+    Perform t-tests of every numerical variable between every pair of groups of every categorical variable.
+    Returns the results of all tests, with effect sizes and multiple-testing corrections.
+    """
+    if group_columns is None:
+        group_columns = df.select_dtypes(include=['object', 'category']).columns
+    if value_columns is None:
+        value_columns = df.select_dtypes(include=['number']).columns
+    results = batch_t_tests(df, group_columns, value_columns, equal_var=equal_var)
+    
+    significant = results[results['p_fdr_bh'] < alpha]
+    print(f"T-tests: {len(results)} tests, {len(significant)} significant at FDR {alpha}")
+    if len(significant) > 0:
+        print(significant.sort_values('p_value').to_string(index=False))
+    print()
+    return results
+
 def chi_square_test(df, col1, col2):
     """
-    Perform a chi-square test for independence between two categorical variables.
+    Perform a chi-square test for independence between two categorical variables, whatever their number of categories.
     """
-    contingency_table = pd.crosstab(df[col1], df[col2])
-    chi2_stat, p_val, dof, expected = stats.chi2_contingency(contingency_table)
+    result = batch_chi_square_tests(df, [col1, col2], max_categories=None).iloc[0]
+    chi2_stat, p_val = result['chi2'], result['p_value']
     print(f"Chi-square test between {col1} and {col2}:")
     print(f"Chi2 Statistic: {chi2_stat:.4f}, P-value: {p_val:.4f}\n")
 
+def chi_square_tests(df, columns=None, n_jobs=1, alpha=0.05):
+    """
+    Perform chi-square tests for independence between every pair of categorical variables.
+    Returns the results of all tests, with Cramer's V, low expected count flags and multiple-testing corrections.
+    """
+    if columns is None:
+        columns = df.select_dtypes(include=['object', 'category']).columns
+    results = batch_chi_square_tests(df, columns, n_jobs=n_jobs)
+    
+    significant = results[results['p_fdr_bh'] < alpha]
+    print(f"Chi-square tests: {len(results)} tests, {len(significant)} significant at FDR {alpha}, "
+          f"{int(results['low_expected'].sum())} with too many low expected counts")
+    if len(significant) > 0:
+        print(significant.sort_values('p_value').to_string(index=False))
+    print()
+    return results
+
 def correlation_test(df, col1, col2):
     """
     Perform a Pearson correlation test between two numerical variables.
     """
-    corr, p_val = stats.pearsonr(df[col1].dropna(), df[col2].dropna())
+    result = batch_correlation_tests(df, [col1, col2], methods=('pearson',)).iloc[0]
+    corr, p_val = result['pearson_r'], result['pearson_p_value']
     print(f"Pearson correlation test between {col1} and {col2}:")
     print(f"Correlation coefficient: {corr:.4f}, P-value: {p_val:.4f}\n")
 
-def main(file_path):
-    # Load the dataset
-    df = load_dataset(file_path)
+def correlation_tests(df, columns=None, alpha=0.05):
+    """
+    Perform Pearson and Spearman correlation tests between every pair of numerical variables,
+    using the rows where both variables are present.
+    Returns the results of all tests, with confidence intervals and multiple-testing corrections.
+    """
+    results = batch_correlation_tests(df, columns)
+    
+    significant = results[(results['pearson_p_fdr_bh'] < alpha) | (results['spearman_p_fdr_bh'] < alpha)]
+    print(f"Correlation tests: {len(results)} pairs, {len(significant)} significant at FDR {alpha}")
+    if len(significant) > 0:
+        print(significant.sort_values('pearson_p_value').to_string(index=False))
+    print()
+    return results
+
+def resampling_test(df, col1, col2, statistic='mean_difference', n_resamples=9999, precision=None, n_jobs=1, seed=0):
+    """
+    Perform a permutation test and a bootstrap confidence interval for a difference of group means
+    (groups in col1, values in col2), a correlation or a chi-square statistic, without distributional assumptions.
+    """
+    first, second = statistic_inputs(df, col1, col2, statistic)
+    test = permutation_test(first, second, statistic, n_resamples, precision=precision, seed=seed, n_jobs=n_jobs)
+    strata = second.astype(int) if statistic == 'mean_difference' else None
+    interval = bootstrap(first, second, statistic, n_resamples, strata=strata, seed=seed, n_jobs=n_jobs)
+    print(f"Permutation test ({statistic}) between {col1} and {col2}:")
+    print(f"Statistic: {test['statistic']:.4f}, P-value: {test['p_value']:.4f} "
+          f"(+/- {test['standard_error']:.4f}, {test['n_resamples']} permutations)")
+    print(f"Bootstrap 95% CI: [{interval['ci_low']:.4f}, {interval['ci_high']:.4f}]\n")
+    return test, interval
+
+def main(file_path, n_jobs=1, optimize=False):
+    # Load the dataset, with compact dtypes when `optimize`
+    df = load_dataset(file_path, optimize=optimize)
     
-    # Perform t-tests
-    t_test(df, 'GroupColumn', 'ValueColumn')  # Replace with actual column names
+    # Perform t-tests of every numerical variable across the groups of every categorical variable
+    t_tests(df)
 
-    # Perform chi-square tests
-    chi_square_test(df, 'CategoricalColumn1', 'CategoricalColumn2')  # Replace with actual column names
+    # Perform chi-square tests between every pair of categorical variables
+    chi_square_tests(df, n_jobs=n_jobs)
     
-    # Perform correlation tests
-    correlation_test(df, 'NumericalColumn1', 'NumericalColumn2')  # Replace with actual column names
+    # Perform correlation tests between every pair of numerical variables
+    correlation_tests(df)
 
 # Example usage:
 if __name__ == "__main__":
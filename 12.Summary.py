@@ -1,75 +1,156 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from fpdf import FPDF
+import io
 import os
 
-def load_dataset(file_path):
-    """
-    Load the dataset from a CSV file.
-    """
-    return pd.read_csv(file_path)
+from batch_rendering import render_pngs
+from column_profiler import is_categorical, is_numerical, profile_dataframe
+from correlation import correlation_matrix
+from data_loader import load_dataset
+from distribution_summaries import distribution_summaries
+from plotting import (COLUMN_FIGURE_SIZE, HEATMAP_FIGURE_SIZE, column_box_plot_figure, column_histogram_figure,
+                      finish_figure, heatmap_figure, render_parameters)
+from section_cache import SECTION_CACHE_DIR, column_hashes, load_section, save_section, section_key
 
-def generate_summary_statistics(df):
+# Number of bins of the report histograms
+HISTOGRAM_BINS = 20
+
+def generate_summary_statistics(df, profile=None):
     """
     Generate summary statistics for numerical features.
     """
-    summary = df.describe().T
+    if profile is None:
+        profile = profile_dataframe(df)
+    summary = profile['describe'].T
     return summary
 
-def generate_categorical_summary(df):
+def generate_categorical_summary(df, profile=None):
     """
     Generate frequency counts for categorical features.
     """
-    categorical_summary = {}
-    for column in df.select_dtypes(include=['object', 'category']).columns:
-        categorical_summary[column] = df[column].value_counts()
+    if profile is None:
+        profile = profile_dataframe(df)
+    categorical_summary = dict(profile['value_counts'])
     return categorical_summary
 
-def plot_histograms(df, output_dir):
+def histogram_tasks(summaries):
+    """
+    Rendering tasks for the histogram of each numerical variable.
+    """
+    return [(column_histogram_figure, {'column': col, 'summary': summary}) for col, summary in summaries.items()]
+
+def box_plot_tasks(summaries):
+    """
+    Rendering tasks for the box plot of each numerical variable.
+    """
+    return [(column_box_plot_figure, {'column': col, 'summary': summary}) for col, summary in summaries.items()]
+
+def save_pngs(pngs, paths):
+    """
+    Write rendered PNGs to their files.
+    """
+    for png, path in zip(pngs, paths):
+        with open(path, 'wb') as f:
+            f.write(png)
+
+def plot_histograms(df, output_dir, summaries=None, n_jobs=None):
     """
     Plot histograms for numerical variables and save them.
     """
-    numerical_columns = df.select_dtypes(include=['number']).columns
-    for col in numerical_columns:
-        plt.figure(figsize=(10, 6))
-        sns.histplot(df[col], kde=True, bins=20)
-        plt.title(f'Histogram of {col}', fontsize=15)
-        plt.xlabel(col)
-        plt.ylabel('Frequency')
-        plt.savefig(os.path.join(output_dir, f'{col}_histogram.png'))
-        plt.close()
+    if summaries is None:
+        summaries = distribution_summaries(df)
+    pngs = render_pngs(histogram_tasks(summaries), n_jobs)
+    save_pngs(pngs, [os.path.join(output_dir, f'{col}_histogram.png') for col in summaries])
 
-def plot_box_plots(df, output_dir):
+def plot_box_plots(df, output_dir, summaries=None, n_jobs=None):
     """
     Plot box plots for numerical variables and save them.
     """
-    numerical_columns = df.select_dtypes(include=['number']).columns
-    for col in numerical_columns:
-        plt.figure(figsize=(10, 6))
-        sns.boxplot(x=df[col])
-        plt.title(f'Box plot of {col}', fontsize=15)
-        plt.xlabel(col)
-        plt.savefig(os.path.join(output_dir, f'{col}_boxplot.png'))
-        plt.close()
+    if summaries is None:
+        summaries = distribution_summaries(df)
+    pngs = render_pngs(box_plot_tasks(summaries), n_jobs)
+    save_pngs(pngs, [os.path.join(output_dir, f'{col}_boxplot.png') for col in summaries])
 
-def plot_correlation_heatmap(df, output_dir):
+def plot_correlation_heatmap(df, output_dir, top_k=None):
     """
     Plot a correlation heatmap for numerical variables and save it.
     """
-    numerical_columns = df.select_dtypes(include=['number']).columns
-    correlation_matrix = df[numerical_columns].corr()
+    finish_figure(heatmap_figure(correlation_matrix(df), top_k), os.path.join(output_dir, 'correlation_heatmap.png'))
+
+def build_report_sections(df, approximate=False, n_jobs=None, cache_dir=SECTION_CACHE_DIR, top_k=None):
+    """
+    Content of every report section: the summary lines of each numerical variable, the block of each categorical
+    variable, the histogram and box-plot PNG of each numerical variable and the heatmap PNG, keyed by (kind, column).
+    Each section is cached under a hash of its input columns and parameters, and only sections whose inputs changed
+    are recomputed; pass cache_dir=None to rebuild everything. With `top_k`, the heatmap shows only the most
+    correlated variables.
+    """
+    numerical_columns = [column for column in df.columns if is_numerical(df[column])]
+    categorical_columns = [column for column in df.columns if is_categorical(df[column])]
+    hashes = column_hashes(df, numerical_columns + categorical_columns)
+    
+    # Content address of every section, in report order
+    keys = {}
+    for col in numerical_columns:
+        keys[('summary', col)] = (section_key('summary', [hashes[col]], approximate=approximate), '.json')
+    for col in categorical_columns:
+        keys[('categorical', col)] = (section_key('categorical', [hashes[col]], approximate=approximate), '.json')
+    column_figure = render_parameters(COLUMN_FIGURE_SIZE)
+    for col in numerical_columns:
+        keys[('histogram', col)] = (section_key('histogram', [hashes[col]], bins=HISTOGRAM_BINS, **column_figure), '.png')
+    for col in numerical_columns:
+        keys[('box_plot', col)] = (section_key('box_plot', [hashes[col]], **column_figure), '.png')
+    keys[('heatmap', None)] = (section_key('heatmap', [hashes[col] for col in numerical_columns], top_k=top_k,
+                                           **render_parameters(HEATMAP_FIGURE_SIZE)), '.png')
+    
+    sections = {section: load_section(key, extension, cache_dir) for section, (key, extension) in keys.items()}
+    stale = [section for section, content in sections.items() if content is None]
     
-    plt.figure(figsize=(12, 10))
-    sns.heatmap(correlation_matrix, annot=True, fmt='.2f', cmap='coolwarm', square=True, linewidths=.5)
-    plt.title('Correlation Heatmap', fontsize=20)
-    plt.savefig(os.path.join(output_dir, 'correlation_heatmap.png'))
-    plt.close()
+    # Recompute statistics only for the columns of stale text sections
+    stale_columns = [col for kind, col in stale if kind in ('summary', 'categorical')]
+    if stale_columns:
+        profile = profile_dataframe(df[stale_columns], approximate=approximate)
+        summary = generate_summary_statistics(df, profile)
+        for col in profile['numerical_columns']:
+            sections[('summary', col)] = [str(summary.loc[col])]
+        for column, counts in generate_categorical_summary(df, profile).items():
+            sections[('categorical', column)] = [f'{column}:'] + [f'    {category}: {count}' for category, count in counts.items()]
+    
+    # Redraw only stale figures, in parallel
+    stale_figures = [section for section in stale if section[0] in ('histogram', 'box_plot', 'heatmap')]
+    summaries = distribution_summaries(df, list(dict.fromkeys(col for kind, col in stale_figures if kind != 'heatmap')),
+                                       bins=HISTOGRAM_BINS)
+    tasks = []
+    for kind, col in stale_figures:
+        if kind == 'histogram':
+            tasks.append((column_histogram_figure, {'column': col, 'summary': summaries[col]}))
+        elif kind == 'box_plot':
+            tasks.append((column_box_plot_figure, {'column': col, 'summary': summaries[col]}))
+        else:
+            tasks.append((heatmap_figure, {'correlation': correlation_matrix(df, numerical_columns), 'top_k': top_k}))
+    for section, png in zip(stale_figures, render_pngs(tasks, n_jobs)):
+        sections[section] = png
+    
+    for section in stale:
+        key, extension = keys[section]
+        save_section(key, extension, sections[section], cache_dir)
+    print(f'Report sections: {len(sections) - len(stale)} cached, {len(stale)} rebuilt')
+    return sections
 
-def generate_pdf_report(df, output_dir, pdf_path):
+def generate_pdf_report(df, output_dir, pdf_path, approximate=False, n_jobs=None, cache_dir=SECTION_CACHE_DIR,
+                        top_k=None):
     """
     Generate a PDF report with key statistics, visualizations, and findings.
+    With `approximate`, the statistics come from bounded-memory sketches instead of exact scans.
+    Sections come from build_report_sections, so a rerun only rebuilds those whose input columns changed.
+    Figures are embedded from memory; they are also written to `output_dir` unless it is None.
     """
+    sections = build_report_sections(df, approximate=approximate, n_jobs=n_jobs, cache_dir=cache_dir, top_k=top_k)
+    if output_dir is not None:
+        names = {'histogram': '{}_histogram.png', 'box_plot': '{}_boxplot.png', 'heatmap': 'correlation_heatmap.png'}
+        figures = [(kind, col) for kind, col in sections if kind in names]
+        save_pngs([sections[figure] for figure in figures],
+                  [os.path.join(output_dir, names[kind].format(col)) for kind, col in figures])
+    
     pdf = FPDF()
     pdf.set_auto_page_break(auto=True, margin=15)
     
@@ -83,67 +164,65 @@ def generate_pdf_report(df, output_dir, pdf_path):
     pdf.set_font("Arial", 'B', 12)
     pdf.cell(200, 10, 'Summary Statistics', ln=True)
     
-    summary = generate_summary_statistics(df)
     pdf.set_font("Arial", '', 10)
-    for i in range(len(summary)):
-        pdf.cell(0, 10, str(summary.iloc[i]), ln=True)
+    for kind, col in sections:
+        if kind == 'summary':
+            for line in sections[(kind, col)]:
+                pdf.cell(0, 10, line, ln=True)
     
     # Add categorical summary
     pdf.add_page()
     pdf.set_font("Arial", 'B', 12)
     pdf.cell(200, 10, 'Categorical Summary', ln=True)
     
-    categorical_summary = generate_categorical_summary(df)
     pdf.set_font("Arial", '', 10)
-    for column, counts in categorical_summary.items():
-        pdf.cell(0, 10, f'{column}:', ln=True)
-        for category, count in counts.items():
-            pdf.cell(0, 10, f'    {category}: {count}', ln=True)
+    for kind, col in sections:
+        if kind == 'categorical':
+            for line in sections[(kind, col)]:
+                pdf.cell(0, 10, line, ln=True)
     
     # Add histograms
-    plot_histograms(df, output_dir)
     pdf.add_page()
     pdf.set_font("Arial", 'B', 12)
     pdf.cell(200, 10, 'Histograms', ln=True)
     
-    for col in df.select_dtypes(include=['number']).columns:
-        pdf.add_page()
-        pdf.image(os.path.join(output_dir, f'{col}_histogram.png'), x=10, y=30, w=190)
+    for kind, col in sections:
+        if kind == 'histogram':
+            pdf.add_page()
+            pdf.image(io.BytesIO(sections[(kind, col)]), x=10, y=30, w=190)
     
     # Add box plots
-    plot_box_plots(df, output_dir)
     pdf.add_page()
     pdf.set_font("Arial", 'B', 12)
     pdf.cell(200, 10, 'Box Plots', ln=True)
     
-    for col in df.select_dtypes(include=['number']).columns:
-        pdf.add_page()
-        pdf.image(os.path.join(output_dir, f'{col}_boxplot.png'), x=10, y=30, w=190)
+    for kind, col in sections:
+        if kind == 'box_plot':
+            pdf.add_page()
+            pdf.image(io.BytesIO(sections[(kind, col)]), x=10, y=30, w=190)
     
     # Add correlation heatmap
-    plot_correlation_heatmap(df, output_dir)
     pdf.add_page()
     pdf.set_font("Arial", 'B', 12)
     pdf.cell(200, 10, 'Correlation Heatmap', ln=True)
     pdf.add_page()
-    pdf.image(os.path.join(output_dir, 'correlation_heatmap.png'), x=10, y=30, w=190)
+    pdf.image(io.BytesIO(sections[('heatmap', None)]), x=10, y=30, w=190)
     
     # Save the PDF report
     pdf.output(pdf_path)
     print(f'Report saved to {pdf_path}')
 
-def main(file_path):
-    # Load the dataset
-    df = load_dataset(file_path)
+def main(file_path, approximate=False, output_dir='plots', n_jobs=None, optimize=False):
+    # Load the dataset, with compact dtypes when `optimize`
+    df = load_dataset(file_path, optimize=optimize)
     
-    # Create output directory for plots
-    output_dir = 'plots'
-    if not os.path.exists(output_dir):
+    # Create output directory for plots, unless they are only embedded in the report
+    if output_dir is not None and not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
     # Generate PDF report
     pdf_path = 'data_analysis_report.pdf'
-    generate_pdf_report(df, output_dir, pdf_path)
+    generate_pdf_report(df, output_dir, pdf_path, approximate=approximate, n_jobs=n_jobs)
 
 # Example usage:
 if __name__ == "__main__":
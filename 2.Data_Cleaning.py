@@ -1,72 +1,230 @@
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import chain
+
+import numpy as np
 import pandas as pd
 
-def load_dataset(file_path):
+from column_profiler import (MAX_NUMERIC_VALUE_COUNTS, as_text, is_categorical, is_numerical, merge_dtypes,
+                            update_numeric_value_counts)
+from data_loader import get_cache_path, load_dataset, iter_chunks
+from date_parsing import parse_date_columns, resolve_date_formats
+from duplicate_detection import drop_rows, drop_seen_rows, find_duplicates, new_seen_rows
+
+def coerce_chunk(chunk, dtypes):
+    """
+    Cast a chunk to the dtypes of the whole columns, so all chunks are cleaned and written with the same schema.
+    A column read as numbers in this chunk but as text in others is converted to text (see as_text), keeping its
+    missing values, rather than to Python numbers in an object column.
+    """
+    converted = {}
+    for column in chunk.columns:
+        values = chunk[column]
+        dtype = dtypes.get(column, values.dtype)
+        if values.dtype == dtype:
+            continue
+        if is_numerical(values) and not is_numerical(dtype):
+            converted[column] = as_text(values)
+        else:
+            converted[column] = values.astype(dtype)
+    return chunk.assign(**converted) if converted else chunk
+
+def compute_fill_values(chunks):
+    """
+    Find each column's dtype across all chunks and the value used to fill its missing entries.
+    Numerical columns are filled with the mean and categorical columns with the mode. The mode of a column read as
+    numbers in some chunks and as text in others counts the numbers by their text (see as_text), as coerce_chunk
+    converts them, unless those chunks had more than MAX_NUMERIC_VALUE_COUNTS distinct values.
+    """
+    dtypes = {}
+    sums = {}
+    counts = {}
+    value_counts = {}
+    numeric_value_counts = {}
+    for chunk in chunks:
+        for column in chunk.columns:
+            values = chunk[column]
+            dtypes[column] = merge_dtypes(dtypes.get(column, values.dtype), values.dtype)
+            if is_numerical(values):
+                sums[column] = sums.get(column, 0.0) + values.sum()
+                counts[column] = counts.get(column, 0) + values.count()
+                update_numeric_value_counts(numeric_value_counts, column, values)
+            elif is_categorical(values):
+                chunk_counts = values.value_counts()
+                previous = value_counts.get(column)
+                value_counts[column] = chunk_counts if previous is None else previous.add(chunk_counts, fill_value=0)
+
+    fill_values = {}
+    for column, dtype in dtypes.items():
+        if is_numerical(dtype):
+            if counts.get(column, 0) > 0:
+                fill_values[column] = sums[column] / counts[column]
+            continue
+        column_counts = value_counts.get(column)
+        if column_counts is not None and column in numeric_value_counts:
+            if numeric_value_counts[column] is None:
+                warnings.warn("The mode of column {} leaves out the chunks read as numbers, which had more than {} "
+                              "distinct values.".format(column, MAX_NUMERIC_VALUE_COUNTS))
+            else:
+                column_counts = column_counts.add(numeric_value_counts[column], fill_value=0)
+        if column_counts is not None and len(column_counts) > 0:
+            # Same tie-break as Series.mode()[0]: the smallest of the most frequent values
+            fill_values[column] = column_counts[column_counts == column_counts.max()].index.sort_values()[0]
+    return fill_values, dtypes
+
+def fill_missing(df, fill_values):
     """
-    Load the dataset from a CSV file.
+    Fill missing values of all columns in one vectorized call.
     """
-    return pd.read_csv(file_path)
+    return df.fillna({column: value for column, value in fill_values.items() if column in df.columns})
+
+def normalize_categoricals(df):
+    """
+    Convert categorical text data to lowercase and strip leading/trailing whitespace.
+    Each distinct value is normalised once and broadcast back through integer codes; the result is a category column.
+    """
+    normalized = {}
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+        elif is_categorical(values):
+            codes, uniques = pd.factorize(values)
+        else:
+            continue
+        # Several raw values can normalise to the same one; non-strings, such as numbers in an object column,
+        # are normalised as their text
+        unique_codes, categories = pd.factorize(pd.Series(uniques, dtype=object).astype(str).str.lower().str.strip())
+        normalized[column] = pd.Categorical.from_codes(np.append(unique_codes, -1)[codes], categories=categories)
+    if not normalized:
+        return df
+    return df.assign(**normalized)
+
+def prepare_chunk(chunk, fill_values, dtypes, date_formats, executor=None):
+    """
+    Apply the cleaning steps that run before duplicate removal to one chunk.
+    Chunks are first cast to the dtypes of the whole column (see coerce_chunk).
+    """
+    chunk = fill_missing(coerce_chunk(chunk, dtypes), fill_values)
+    return parse_date_columns(chunk, date_formats, executor)
+
+def write_chunks(chunks, output_path):
+    """
+    Stream dataframes to disk one at a time: to Parquet when the path ends in '.parquet', otherwise to CSV.
+    """
+    if output_path.endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                else:
+                    table = table.cast(writer.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        header = True
+        for chunk in chunks:
+            chunk.to_csv(output_path, mode='w' if header else 'a', header=header, index=False)
+            header = False
+
+def run_cleaning_pipeline(read_chunks, output_path, subset=None, date_schema_path=None, n_jobs=None):
+    """
+    Clean the dataset chunk by chunk and stream the result to `output_path`.
+    `read_chunks` is called once per pass and must return an iterable of dataframes, so datasets larger than memory
+    can be cleaned. It makes two passes: the first finds the dtype and fill value of every column, and the second
+    prepares each chunk once, drops the rows that repeat an earlier row (on the `subset` columns when given, see
+    duplicate_detection.drop_seen_rows) and writes the output.
+    Date formats are inferred from the first chunk, or read from `date_schema_path` when cached by an earlier run,
+    and date columns are parsed by `n_jobs` worker processes (one per date column by default).
+    """
+    chunks = iter(read_chunks())
+    first = next(chunks, None)
+    date_formats = resolve_date_formats(first if first is not None else pd.DataFrame(), date_schema_path)
+    fill_values, dtypes = compute_fill_values(chain([first], chunks) if first is not None else [])
+    if n_jobs is None:
+        n_jobs = min(len(date_formats), os.cpu_count() or 1)
+
+    seen = new_seen_rows()
+    with ProcessPoolExecutor(n_jobs) if n_jobs > 1 else nullcontext() as executor:
+        prepared = (prepare_chunk(chunk, fill_values, dtypes, date_formats, executor) for chunk in read_chunks())
+        write_chunks((normalize_categoricals(drop_seen_rows(seen, chunk, subset)) for chunk in prepared), output_path)
+
+    print("\nMissing values handled.")
+    print("\nData types corrected.")
+    if seen['dropped'] > 0:
+        print("\n{} duplicate rows found and removed.".format(seen['dropped']))
+    else:
+        print("\nNo duplicate rows found.")
+    print("\nCategorical variables standardized.")
 
 def handle_missing_values(df):
     """
     Handle missing values in the dataframe.
     For simplicity, we will fill numerical missing values with the mean and categorical missing values with the mode.
+    Returns a new dataframe; `df` is left unchanged.
     """
-    for column in df.columns:
-        if df[column].dtype == 'object':
-            df[column].fillna(df[column].mode()[0], inplace=True)
-        else:
-            df[column].fillna(df[column].mean(), inplace=True)
+    fill_values, _ = compute_fill_values([df])
+    df = fill_missing(df, fill_values)
     print("\nMissing values handled.")
+    return df
 
-def correct_data_types(df):
+def correct_data_types(df, date_formats=None):
     """
     Correct data types if necessary.
     Example: Convert 'date' columns from string to datetime.
+    The format of each date column is inferred once from a sample unless given in `date_formats`.
     """
-    for column in df.columns:
-        if 'date' in column.lower():
-            df[column] = pd.to_datetime(df[column])
+    if date_formats is None:
+        date_formats = resolve_date_formats(df)
+    df = parse_date_columns(df, date_formats)
     print("\nData types corrected.")
+    return df
 
-def check_duplicates(df):
+def check_duplicates(df, subset=None):
     """
     Check for and handle duplicate rows.
+    Pass `subset` to treat rows as duplicates when only those columns match, e.g. participant ID and visit date.
+    Returns a new dataframe without the duplicate rows; `df` is left unchanged.
     """
-    duplicates = df.duplicated().sum()
-    if duplicates > 0:
-        df.drop_duplicates(inplace=True)
-        print("\n{} duplicate rows found and removed.".format(duplicates))
+    duplicates = find_duplicates([df], subset=subset)
+    if len(duplicates) > 0:
+        df = next(drop_rows([df], duplicates))
+        print("\n{} duplicate rows found and removed.".format(len(duplicates)))
     else:
         print("\nNo duplicate rows found.")
+    return df
 
 def standardize_categorical_variables(df):
     """
     Standardize categorical variables.
     Convert categorical text data to lowercase and strip leading/trailing whitespace.
     """
-    for column in df.select_dtypes(include=['object', 'category']).columns:
-        df[column] = df[column].str.lower().str.strip()
+    df = normalize_categoricals(df)
     print("\nCategorical variables standardized.")
+    return df
+
+def main(file_path, chunksize=None, output_format='csv', subset=None, n_jobs=None, optimize=False):
+    # Read the dataset whole, or in chunks of `chunksize` rows when it does not fit in memory
+    if chunksize is None:
+        df = load_dataset(file_path, optimize=optimize)
+        read_chunks = lambda: [df]
+    else:
+        read_chunks = lambda: iter_chunks(file_path, chunksize=chunksize)
 
-def main(file_path):
-    # Load the dataset
-    df = load_dataset(file_path)
-    
-    # Handle missing values
-    handle_missing_values(df)
-    
-    # Correct data types
-    correct_data_types(df)
-    
-    # Check for duplicates
-    check_duplicates(df)
-    
-    # Standardize categorical variables
-    standardize_categorical_variables(df)
-    
-    # Save the cleaned dataset
-    cleaned_file_path = "cleaned_" + file_path
-    df.to_csv(cleaned_file_path, index=False)
+    # Handle missing values, correct data types, remove duplicates and standardize categorical variables,
+    # streaming the cleaned dataset to disk
+    cleaned_file_path = "cleaned_" + os.path.splitext(file_path)[0] + "." + output_format
+    date_schema_path = get_cache_path(file_path, suffix='.dates.json')
+    run_cleaning_pipeline(read_chunks, cleaned_file_path, subset=subset, date_schema_path=date_schema_path, n_jobs=n_jobs)
     print("\nCleaned dataset saved to {}".format(cleaned_file_path))
 
 # Example usage:
@@ -1,54 +1,59 @@
-import pandas as pd
+from column_profiler import profile_dataframe
+from data_loader import load_dataset
 
-def load_dataset(file_path):
-    """
-    Load the dataset from a CSV file.
-    """
-    return pd.read_csv(file_path)
-
-def generate_summary_statistics(df):
+def generate_summary_statistics(df, profile=None):
     """
     Generate summary statistics for numerical features.
     """
+    if profile is None:
+        profile = profile_dataframe(df)
     print("\nSummary statistics for numerical features:")
-    print(df.describe())
+    print(profile['describe'])
 
-def generate_categorical_summary(df):
+def generate_categorical_summary(df, profile=None):
     """
     Generate frequency counts for categorical features.
     """
+    if profile is None:
+        profile = profile_dataframe(df)
     print("\nSummary statistics for categorical features:")
-    for column in df.select_dtypes(include=['object', 'category']).columns:
+    for column, counts in profile['value_counts'].items():
         print("\nColumn: {}".format(column))
-        print(df[column].value_counts())
+        print(counts)
 
-def get_dataset_overview(df):
+def get_dataset_overview(df, profile=None):
     """
     Get an overview of the dataset.
     """
+    if profile is None:
+        profile = profile_dataframe(df)
     print("\nDataset Overview:")
-    print("Number of rows: {}".format(df.shape[0]))
-    print("Number of columns: {}".format(df.shape[1]))
+    print("Number of rows: {}".format(profile['n_rows']))
+    print("Number of columns: {}".format(len(profile['columns'])))
     print("Column names:")
-    print(df.columns.tolist())
+    print(profile['columns'])
     print("\nData types:")
-    print(df.dtypes)
+    print(profile['dtypes'])
     print("\nMissing values in the dataset:")
-    missing_values = df.isnull().sum()
+    missing_values = profile['missing']
     print(missing_values[missing_values > 0])
 
-def main(file_path):
-    # Load the dataset
-    df = load_dataset(file_path)
+def main(file_path, n_jobs=1, approximate=False, optimize=False):
+    # Load the dataset, with compact dtypes when `optimize`
+    df = load_dataset(file_path, optimize=optimize)
+    
+    # Profile every column once, across `n_jobs` worker processes or with sketches when `approximate`;
+    # the sections below render from the profile
+    profile = profile_dataframe(df, n_jobs=n_jobs, approximate=approximate)
     
     # Get dataset overview
-    get_dataset_overview(df)
+    get_dataset_overview(df, profile)
     
     # Generate summary statistics for numerical features
-    generate_summary_statistics(df)
+    generate_summary_statistics(df, profile)
     
     # Generate summary statistics for categorical features
-    generate_categorical_summary(df)
+    generate_categorical_summary(df, profile)
 
 # Example usage:
 if __name__ == "__main__":
@@ -1,32 +1,21 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-def load_dataset(file_path):
-    """
-    Load the dataset from a CSV file.
-    """
-    return pd.read_csv(file_path)
+from data_loader import load_dataset
+from distribution_summaries import distribution_summaries
+from plotting import box_plots_figure, finish_figure, histograms_figure
 
-def plot_histograms(df):
+def plot_histograms(df, summaries=None):
     """
     Plot histograms for numerical variables.
     """
-    numerical_columns = df.select_dtypes(include=['number']).columns
-    df[numerical_columns].hist(figsize=(15, 15), bins=20, edgecolor='black')
-    plt.suptitle('Histograms of Numerical Features', fontsize=20)
-    plt.show()
+    finish_figure(histograms_figure(df, summaries))
 
-def plot_boxplots(df):
+def plot_boxplots(df, summaries=None):
     """
     Plot box plots for numerical variables.
     """
-    numerical_columns = df.select_dtypes(include=['number']).columns
-    plt.figure(figsize=(15, 10))
-    df[numerical_columns].boxplot()
-    plt.title('Box plots of Numerical Features', fontsize=20)
-    plt.xticks(rotation=90)
-    plt.show()
+    finish_figure(box_plots_figure(df, summaries))
 
 def plot_bar_charts(df):
     """
@@ -39,15 +28,18 @@ def plot_bar_charts(df):
         plt.title(f'Bar Chart of {column}', fontsize=15)
         plt.show()
 
-def main(file_path):
-    # Load the dataset
-    df = load_dataset(file_path)
+def main(file_path, optimize=False):
+    # Load the dataset, with compact dtypes when `optimize`
+    df = load_dataset(file_path, optimize=optimize)
+    
+    # Summarise the distributions of numerical variables once for all plots
+    summaries = distribution_summaries(df)
     
     # Plot histograms for numerical variables
-    plot_histograms(df)
+    plot_histograms(df, summaries)
     
     # Plot box plots for numerical variables
-    plot_boxplots(df)
+    plot_boxplots(df, summaries)
     
     # Plot bar charts for categorical variables
     plot_bar_charts(df)
@@ -1,19 +1,14 @@
-import pandas as pd
 import matplotlib.pyplot as plt
-import seaborn as sns
 
-def load_dataset(file_path):
-    """
-    Load the dataset from a CSV file.
-    """
-    return pd.read_csv(file_path)
+from data_loader import load_dataset
+from plotting import correlation_heatmap_figure, finish_figure, grouped_box_plot_figure, pairplot_figure
 
-def plot_scatter_plots(df):
+def plot_scatter_plots(df, max_points=5000, top_k=None):
     """
     Plot scatter plots for pairs of numerical variables.
     """
     numerical_columns = df.select_dtypes(include=['number']).columns
-    sns.pairplot(df[numerical_columns], diag_kind='kde')
+    pairplot_figure(df, numerical_columns, diag_kind='kde', max_points=max_points, top_k=top_k)
     plt.suptitle('Scatter Plots of Numerical Features', y=1.02, fontsize=20)
     plt.show()
 
@@ -26,27 +21,17 @@ def plot_box_plots(df):
     
     for num_col in numerical_columns:
         for cat_col in categorical_columns:
-            plt.figure(figsize=(12, 6))
-            sns.boxplot(x=cat_col, y=num_col, data=df, palette='viridis')
-            plt.title(f'Box Plot of {num_col} by {cat_col}', fontsize=15)
-            plt.xticks(rotation=45)
-            plt.show()
+            finish_figure(grouped_box_plot_figure(df, cat_col, num_col))
 
-def plot_correlation_heatmap(df):
+def plot_correlation_heatmap(df, top_k=None):
     """
     Plot a correlation heatmap for numerical variables.
     """
-    numerical_columns = df.select_dtypes(include=['number']).columns
-    correlation_matrix = df[numerical_columns].corr()
-    
-    plt.figure(figsize=(12, 10))
-    sns.heatmap(correlation_matrix, annot=True, fmt='.2f', cmap='coolwarm', square=True, linewidths=.5)
-    plt.title('Correlation Heatmap', fontsize=20)
-    plt.show()
+    finish_figure(correlation_heatmap_figure(df, top_k))
 
-def main(file_path):
-    # Load the dataset
-    df = load_dataset(file_path)
+def main(file_path, optimize=False):
+    # Load the dataset, with compact dtypes when `optimize`
+    df = load_dataset(file_path, optimize=optimize)
     
     # Plot scatter plots for numerical variables
     plot_scatter_plots(df)
@@ -1,57 +1,59 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.decomposition import PCA
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
 
-def load_dataset(file_path):
-    """
-    Load the dataset from a CSV file.
-    """
-    return pd.read_csv(file_path)
+from clustering import assign_clusters, fit_kmeans, kmeans_sweep
+from data_loader import load_dataset
+from design_matrix import fit_pca, pca_scores, standardized_matrix
+from plotting import pairplot_figure
 
-def plot_pair_plots(df):
+def plot_pair_plots(df, max_points=5000, top_k=None):
     """
     Plot pair plots for numerical variables.
     """
     numerical_columns = df.select_dtypes(include=['number']).columns
-    sns.pairplot(df[numerical_columns])
+    pairplot_figure(df, numerical_columns, max_points=max_points, top_k=top_k)
     plt.suptitle('Pair Plots of Numerical Features', y=1.02, fontsize=20)
     plt.show()
 
-def perform_pca(df, n_components=2):
+def perform_pca(df, n_components=2, method='auto', dtype='float64'):
     """
     Perform Principal Component Analysis (PCA) and plot the results.
+    `method` is 'full', 'randomized' (faster on wide data) or 'auto'; the fitted components are cached and reused.
     """
-    numerical_columns = df.select_dtypes(include=['number']).columns
-    x = df[numerical_columns].dropna()  # Drop rows with missing values for PCA
-    x = StandardScaler().fit_transform(x)  # Standardize the data
-
-    pca = PCA(n_components=n_components)
-    principal_components = pca.fit_transform(x)
+    matrix = standardized_matrix(df, dtype=dtype)  # Standardized rows without missing values, shared with clustering
+    pca = fit_pca(matrix, n_components, method)
+    principal_components = pca_scores(pca, matrix['x'])
     pca_df = pd.DataFrame(data=principal_components, columns=[f'PC{i+1}' for i in range(n_components)])
 
     plt.figure(figsize=(10, 7))
     sns.scatterplot(x='PC1', y='PC2', data=pca_df, palette='viridis')
     plt.title('PCA: First two principal components', fontsize=15)
     plt.show()
-    print("Explained variance ratio by each principal component:", pca.explained_variance_ratio_)
+    print("Explained variance ratio by each principal component:", pca['explained_variance_ratio'])
 
-def perform_kmeans_clustering(df, n_clusters=3):
+def perform_kmeans_clustering(df, n_clusters=None, k_values=range(2, 11), n_jobs=1, sample_size=5000,
+                              mini_batch=True, dtype='float64'):
     """
-    Perform K-means clustering and plot the results.
+    Perform K-means clustering and plot the results on the first two principal components.
+    Without `n_clusters`, every k in `k_values` is fitted (in parallel with n_jobs > 1) and the one with the best
+    silhouette score on a sample of `sample_size` rows is kept. Rows with missing values get no cluster.
+    Returns the sweep of k, inertia and silhouette, or None when `n_clusters` is given.
     """
-    numerical_columns = df.select_dtypes(include=['number']).columns
-    x = df[numerical_columns].dropna()  # Drop rows with missing values for clustering
-    x = StandardScaler().fit_transform(x)  # Standardize the data
+    matrix = standardized_matrix(df, dtype=dtype)  # Standardized rows without missing values, shared with PCA
+    x = matrix['x']
 
-    kmeans = KMeans(n_clusters=n_clusters, random_state=0).fit(x)
-    clusters = kmeans.labels_
-    df['Cluster'] = clusters
+    sweep = None
+    if n_clusters is None:
+        sweep, n_clusters, clusters = kmeans_sweep(x, k_values, n_jobs, sample_size, mini_batch)
+        print(sweep.to_string(index=False))
+        print(f"Best number of clusters by silhouette score: {n_clusters}")
+    else:
+        clusters, _ = assign_clusters(x, fit_kmeans(x, n_clusters, mini_batch))
+    df['Cluster'] = pd.Series(pd.NA, index=df.index, dtype='Int64')
+    df.loc[matrix['rows'], 'Cluster'] = clusters  # Align the labels with the rows they were computed from
 
-    pca = PCA(n_components=2)
-    principal_components = pca.fit_transform(x)
+    principal_components = pca_scores(fit_pca(matrix, 2), x)  # Reuses the components fitted by perform_pca
     pca_df = pd.DataFrame(data=principal_components, columns=['PC1', 'PC2'])
     pca_df['Cluster'] = clusters
 
@@ -59,10 +61,11 @@ def perform_kmeans_clustering(df, n_clusters=3):
     sns.scatterplot(x='PC1', y='PC2', hue='Cluster', data=pca_df, palette='viridis')
     plt.title(f'K-means Clustering with {n_clusters} Clusters', fontsize=15)
     plt.show()
+    return sweep
 
-def main(file_path):
-    # Load the dataset
-    df = load_dataset(file_path)
+def main(file_path, optimize=False):
+    # Load the dataset, with compact dtypes when `optimize`
+    df = load_dataset(file_path, optimize=optimize)
     
     # Plot pair plots for numerical variables
     plot_pair_plots(df)
@@ -1,13 +1,7 @@
-import pandas as pd
 import matplotlib.pyplot as plt
-import seaborn as sns
 from lifelines import KaplanMeierFitter
 
-def load_dataset(file_path):
-    """
-    Load the dataset from a CSV file.
-    """
-    return pd.read_csv(file_path)
+from data_loader import load_dataset
 
 def plot_time_series(df, id_column, time_column, value_columns):
     """
@@ -37,9 +31,9 @@ def perform_survival_analysis(df, time_column, event_column):
     plt.ylabel('Survival Probability')
     plt.show()
 
-def main(file_path):
-    # Load the dataset
-    df = load_dataset(file_path)
+def main(file_path, optimize=False):
+    # Load the dataset, with compact dtypes when `optimize`
+    df = load_dataset(file_path, optimize=optimize)
     
     # Define the columns for the analysis
     id_column = "ParticipantID"  # Replace with the actual column name for participant ID
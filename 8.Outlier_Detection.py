@@ -1,46 +1,55 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+from data_loader import load_dataset
+from outliers import detect_outliers, isolation_forest_outliers, outlier_counts, outlier_mask
+from plotting import box_plots_figure, finish_figure, outlier_scatter_figure, scatter_figure
 
-def load_dataset(file_path):
+def detect_outliers_zscore(df, threshold=3, chunksize=100000):
     """
-    Load the dataset from a CSV file.
+    Detect outliers in numerical variables using Z-scores.
+    Returns the outlier flags as a bitmask; read it with outliers.outlier_mask.
     """
-    return pd.read_csv(file_path)
+    return detect_outliers_by_method(df, 'zscore', threshold, chunksize)
 
-def detect_outliers_zscore(df, threshold=3):
+def detect_outliers_by_method(df, method='zscore', threshold=None, chunksize=100000):
     """
-    Detect outliers using Z-scores.
+    Detect outliers in numerical variables using Z-scores ('zscore'), robust Z-scores from the median absolute
+    deviation ('mad') or interquartile range fences ('iqr'), reading the data in chunks of `chunksize` rows.
+    Returns the outlier flags as a bitmask; read it with outliers.outlier_mask.
     """
-    z_scores = np.abs((df - df.mean()) / df.std())
-    outliers = (z_scores > threshold).sum().sum()
-    print(f"\nNumber of outliers detected using Z-score method: {outliers}")
-    return z_scores > threshold
+    flags = detect_outliers(df, method, threshold, chunksize=chunksize)
+    outliers = outlier_counts(flags).sum()
+    print(f"\nNumber of outliers detected using {method} method: {outliers}")
+    return flags
 
-def plot_box_plots(df):
+def detect_outliers_isolation_forest(df, contamination='auto', n_jobs=None):
+    """
+    Detect multivariate outliers among rows using an isolation forest on the numerical variables.
+    Returns the boolean outlier flag of every row.
+    """
+    flags = outlier_mask(isolation_forest_outliers(df, contamination=contamination, n_jobs=n_jobs))
+    print(f"\nNumber of rows detected as outliers by isolation forest: {flags.sum()}")
+    return flags
+
+def plot_box_plots(df, summaries=None):
     """
     Plot box plots for numerical variables to visualize outliers.
     """
-    numerical_columns = df.select_dtypes(include=['number']).columns
-    plt.figure(figsize=(15, 10))
-    df[numerical_columns].boxplot()
-    plt.title('Box plots of Numerical Features', fontsize=20)
-    plt.xticks(rotation=90)
-    plt.show()
+    finish_figure(box_plots_figure(df, summaries))
 
 def plot_scatter_plots(df, x_column, y_column):
     """
     Plot scatter plots to visualize outliers.
     """
-    plt.figure(figsize=(10, 7))
-    sns.scatterplot(x=x_column, y=y_column, data=df)
-    plt.title(f'Scatter Plot of {x_column} vs {y_column}', fontsize=15)
-    plt.show()
+    finish_figure(scatter_figure(df, x_column, y_column))
+
+def plot_outlier_scatter_plots(df, x_column, y_column, outliers):
+    """
+    Plot scatter plots with outliers highlighted.
+    """
+    finish_figure(outlier_scatter_figure(df, x_column, y_column, outliers))
 
-def main(file_path):
-    # Load the dataset
-    df = load_dataset(file_path)
+def main(file_path, optimize=False):
+    # Load the dataset, with compact dtypes when `optimize`
+    df = load_dataset(file_path, optimize=optimize)
     
     # Detect outliers using Z-scores
     outliers_zscore = detect_outliers_zscore(df)
@@ -57,10 +66,8 @@ def main(file_path):
     # Highlight outliers in scatter plots
     for i in range(len(numerical_columns)):
         for j in range(i + 1, len(numerical_columns)):
-            plt.figure(figsize=(10, 7))
-            sns.scatterplot(x=numerical_columns[i], y=numerical_columns[j], data=df, hue=outliers_zscore[numerical_columns[i]] | outliers_zscore[numerical_columns[j]], palette={True: 'red', False: 'blue'})
-            plt.title(f'Scatter Plot of {numerical_columns[i]} vs {numerical_columns[j]} with Outliers Highlighted', fontsize=15)
-            plt.show()
+            outliers = outlier_mask(outliers_zscore, numerical_columns[i]) | outlier_mask(outliers_zscore, numerical_columns[j])
+            plot_outlier_scatter_plots(df, numerical_columns[i], numerical_columns[j], outliers)
 
 # Example usage:
 if __name__ == "__main__":
@@ -1,11 +1,7 @@
 import pandas as pd
 from sklearn.preprocessing import StandardScaler, MinMaxScaler, OneHotEncoder
 
-def load_dataset(file_path):
-    """
-    Load the dataset from a CSV file.
-    """
-    return pd.read_csv(file_path)
+from data_loader import load_dataset
 
 def create_new_features(df):
     """
@@ -50,9 +46,9 @@ def encode_categorical_variables(df):
     print("\nCategorical variables encoded using OneHotEncoder.")
     return df
 
-def main(file_path):
-    # Load the dataset
-    df = load_dataset(file_path)
+def main(file_path, optimize=False):
+    # Load the dataset, with compact dtypes when `optimize`
+    df = load_dataset(file_path, optimize=optimize)
     
     # Create new features
     df = create_new_features(df)
@@ -0,0 +1,88 @@
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+import plotting
+
+FIGURES = {
+    'histograms': plotting.histograms_figure,
+    'box_plots': plotting.box_plots_figure,
+    'scatter': plotting.scatter_figure,
+    'correlation_heatmap': plotting.correlation_heatmap_figure,
+    'violin': plotting.violin_figure,
+}
+
+# Dataset held by each worker process, set once by init_worker
+_df = None
+
+def init_worker(df):
+    """
+    Give a worker process its copy of the dataset and a non-interactive backend.
+    Under the fork start method the dataframe is inherited rather than pickled.
+    """
+    global _df
+    plt.switch_backend('Agg')
+    _df = df
+
+def render_task(task):
+    """
+    Draw one figure and save it; runs in a worker process.
+    """
+    kind, arguments, output_path = task
+    plotting.finish_figure(FIGURES[kind](_df, **arguments), output_path)
+    return output_path
+
+def render_png_task(task):
+    """
+    Draw one figure from a (builder, arguments) pair and return it as PNG bytes; runs in a worker process.
+    """
+    builder, arguments = task
+    return plotting.figure_png(builder(**arguments))
+
+def render_pngs(tasks, n_jobs=None):
+    """
+    Render figures to in-memory PNGs with a pool of `n_jobs` worker processes (all cores by default).
+    `tasks` is a list of (builder, arguments) pairs, where builder is a module-level function returning a figure
+    and arguments are small enough to send to the workers, such as precomputed summaries.
+    With n_jobs=1 the figures are drawn in this process. Returns the PNG bytes in task order.
+    """
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs == 1 or len(tasks) <= 1:
+        return [render_png_task(task) for task in tasks]
+    with ProcessPoolExecutor(min(n_jobs, len(tasks)), initializer=init_worker, initargs=(None,)) as executor:
+        return list(executor.map(render_png_task, tasks, chunksize=max(1, len(tasks) // (4 * n_jobs))))
+
+def plot_file_name(kind, arguments):
+    """
+    File name of a plot, built from its kind and the columns it shows.
+    """
+    parts = [kind] + [str(value) for value in arguments.values()]
+    return re.sub(r'[^\w.-]+', '_', '_'.join(parts)) + '.png'
+
+def render_batch(df, tasks, output_dir, n_jobs=None):
+    """
+    Render plots to PNG files in `output_dir` with a pool of `n_jobs` worker processes (all cores by default).
+    `tasks` is a list of (kind, arguments) pairs, where kind is a key of FIGURES and arguments are passed to it.
+    Writes index.csv listing every plot and its file, and returns the index.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(kind, arguments, os.path.join(output_dir, plot_file_name(kind, arguments))) for kind, arguments in tasks]
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(n_jobs, initializer=init_worker, initargs=(df,)) as executor:
+        paths = list(executor.map(render_task, jobs, chunksize=max(1, len(jobs) // (4 * n_jobs))))
+    elapsed = time.perf_counter() - start
+
+    index = pd.DataFrame({
+        'kind': [kind for kind, _ in tasks],
+        'columns': [', '.join(str(value) for value in arguments.values()) for _, arguments in tasks],
+        'path': paths,
+    })
+    index.to_csv(os.path.join(output_dir, 'index.csv'), index=False)
+    print(f"Rendered {len(jobs)} plots to {output_dir} in {elapsed:.1f}s with {n_jobs} workers")
+    return index
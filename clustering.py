@@ -0,0 +1,131 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import pairwise_distances, pairwise_distances_argmin_min
+
+# Rows per mini-batch update, and the most updates a fit makes
+MINI_BATCH_SIZE = 4096
+MINI_BATCH_STEPS = 200
+# A mini-batch fit stops once no centre moves by more than this fraction of the mean column variance in one update
+MINI_BATCH_TOLERANCE = 1e-4
+
+# Matrix and sample rows held by each worker process, set once by init_worker
+_x = None
+_sample = None
+
+# During a sweep, inertia is estimated on this many times `sample_size` rows
+INERTIA_SAMPLE_FACTOR = 20
+
+def init_worker(x, sample):
+    """
+    Give a worker process the matrix being clustered and the sample rows models are scored on.
+    """
+    global _x, _sample
+    _x, _sample = x, sample
+
+def fit_kmeans(x, n_clusters, mini_batch=True, random_state=0):
+    """
+    Cluster centres of k-means on the rows of a matrix.
+    With mini_batch=True the centres are updated from random batches of MINI_BATCH_SIZE rows until they settle or
+    MINI_BATCH_STEPS updates have been made, so the fit does not scale with the number of rows. The batches are drawn
+    here and fed to MiniBatchKMeans.partial_fit, because MiniBatchKMeans.fit draws every batch with a weighted sample
+    over all rows.
+    """
+    if not mini_batch:
+        return KMeans(n_clusters=n_clusters, n_init='auto', random_state=random_state).fit(x).cluster_centers_
+
+    rng = np.random.default_rng(random_state)
+    model = MiniBatchKMeans(n_clusters=n_clusters, batch_size=MINI_BATCH_SIZE, random_state=random_state)
+    model.partial_fit(x[rng.integers(0, len(x), max(3 * MINI_BATCH_SIZE, n_clusters))])
+    tolerance = MINI_BATCH_TOLERANCE * np.mean(np.var(x[rng.integers(0, len(x), MINI_BATCH_SIZE)], axis=0))
+    for _ in range(MINI_BATCH_STEPS):
+        previous = model.cluster_centers_.copy()
+        model.partial_fit(x[rng.integers(0, len(x), MINI_BATCH_SIZE)])
+        if np.max(np.sum((model.cluster_centers_ - previous) ** 2, axis=1)) <= tolerance:
+            break
+    return model.cluster_centers_
+
+def assign_clusters(x, centers):
+    """
+    Label of the nearest centre for every row, and the inertia (sum of squared distances to it), in one pass.
+    """
+    labels, distances = pairwise_distances_argmin_min(x, centers)
+    return labels, float(np.sum(distances.astype('float64') ** 2))
+
+def silhouette(distances, labels):
+    """
+    Mean silhouette coefficient of labelled rows from their matrix of pairwise distances, as
+    sklearn.metrics.silhouette_score computes it. The distance sums from every row to every cluster are one product
+    with the cluster indicator matrix, so the distance matrix can be computed once and shared by many labellings.
+    Rows in clusters of their own score 0; with fewer than two clusters the score is NaN.
+    """
+    n_clusters = labels.max() + 1
+    indicator = np.zeros((len(labels), n_clusters), dtype=distances.dtype)
+    indicator[np.arange(len(labels)), labels] = 1
+    sizes = indicator.sum(axis=0)
+    if np.count_nonzero(sizes) < 2:
+        return np.nan
+    sums = (distances @ indicator).astype('float64')
+    own = sizes[labels]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        a = sums[np.arange(len(labels)), labels] / (own - 1)
+        means = sums / sizes
+    means[np.arange(len(labels)), labels] = np.inf
+    means[:, sizes == 0] = np.inf
+    b = means.min(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scores = np.where(own > 1, (b - a) / np.maximum(a, b), 0)
+    return float(np.mean(np.nan_to_num(scores)))
+
+def score_k_values(k_values, sample_size, mini_batch=True, random_state=0):
+    """
+    Fit k-means for each number of clusters and score it on the sample rows; runs in a worker process or in this one.
+    Returns, per k, the inertia over all rows estimated from the sample, the silhouette score on the first
+    `sample_size` sample rows and the cluster centres.
+    """
+    x = _x[_sample]
+    # Computed once and shared by every k; float32 halves its memory
+    distances = pairwise_distances(x[:sample_size]).astype('float32')
+    scores = []
+    for k in k_values:
+        centers = fit_kmeans(_x, k, mini_batch, random_state)
+        labels, inertia = assign_clusters(x, centers)
+        scores.append((k, inertia * len(_x) / len(x), silhouette(distances, labels[:sample_size]), centers))
+    return scores
+
+def kmeans_sweep(x, k_values=range(2, 11), n_jobs=1, sample_size=5000, mini_batch=True, random_state=0):
+    """
+    Fit k-means for every number of clusters in `k_values`, spread over `n_jobs` worker processes, and pick the
+    one with the best silhouette score. Models are scored on one random sample shared by all k, so scoring does not
+    grow with the data: silhouettes use at most `sample_size` rows, and inertia is estimated from
+    INERTIA_SAMPLE_FACTOR times as many. Only the best model labels every row.
+    Returns a dataframe of k, inertia and silhouette, the best k, and the labels of every row of `x` under it.
+    """
+    global _x, _sample
+    k_values = [k for k in k_values if 1 < k <= len(x)]
+    if not k_values:
+        raise ValueError("No number of clusters to try between 2 and the number of rows.")
+    rng = np.random.default_rng(random_state)
+    sample = rng.choice(len(x), min(INERTIA_SAMPLE_FACTOR * sample_size, len(x)), replace=False)
+
+    if n_jobs > 1 and len(k_values) > 1:
+        # Interleave the k values so each worker gets a similar mix of cheap and expensive fits
+        shards = [k_values[i::n_jobs] for i in range(min(n_jobs, len(k_values)))]
+        with ProcessPoolExecutor(len(shards), initializer=init_worker, initargs=(x, sample)) as executor:
+            futures = [executor.submit(score_k_values, shard, sample_size, mini_batch, random_state)
+                       for shard in shards]
+            scores = [score for future in futures for score in future.result()]
+    else:
+        init_worker(x, sample)
+        try:
+            scores = score_k_values(k_values, sample_size, mini_batch, random_state)
+        finally:
+            _x, _sample = None, None
+
+    scores.sort(key=lambda score: score[0])
+    sweep = pd.DataFrame([score[:3] for score in scores], columns=['k', 'inertia', 'silhouette'])
+    best = int(np.nanargmax(sweep['silhouette'].to_numpy())) if sweep['silhouette'].notna().any() else 0
+    labels, _ = assign_clusters(x, scores[best][3])
+    return sweep, scores[best][0], labels
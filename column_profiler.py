@@ -0,0 +1,372 @@
+import math
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import sketches
+
+DESCRIBE_INDEX = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+# Value counts of a column read as numbers in some chunks are kept, in case a later chunk turns it into text,
+# until it has more than this many distinct values
+MAX_NUMERIC_VALUE_COUNTS = 1000
+
+def is_numerical(values):
+    """
+    Whether a column (or dtype) is summarised like describe() does: numeric but not boolean.
+    """
+    return pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)
+
+def is_categorical(values):
+    """
+    Whether a column is selected by select_dtypes(include=['object', 'category']).
+    """
+    return (isinstance(values.dtype, pd.CategoricalDtype)
+            or pd.api.types.is_object_dtype(values)
+            or pd.api.types.is_string_dtype(values))
+
+def merge_dtypes(left, right):
+    """
+    Combine the dtypes a column had in two chunks into the dtype of the whole column.
+    """
+    if left == right:
+        return left
+    if pd.api.types.is_numeric_dtype(left) and pd.api.types.is_numeric_dtype(right):
+        return np.promote_types(left, right)
+    return np.dtype('object')
+
+def as_text(values):
+    """
+    A column's values as strings, as a text column read from the same CSV would hold them; missing values stay missing.
+    Whole floats lose their '.0', so a chunk read as float because of a missing value matches one read as int.
+    """
+    text = values.astype(str).astype(object)
+    if pd.api.types.is_float_dtype(values):
+        x = values.to_numpy(dtype='float64', na_value=np.nan)
+        whole = np.isfinite(x) & (x == np.round(x)) & (np.abs(x) < 2 ** 53)
+        text[whole] = x[whole].astype(np.int64).astype(str)
+    return text.where(values.notna())
+
+def counts_by_text(counts):
+    """
+    Value counts of numbers re-keyed by their text (see as_text); numbers written the same, such as 1 and 1.0, are added.
+    """
+    return counts.groupby(as_text(pd.Series(counts.index)).to_numpy(), sort=False).sum()
+
+def update_numeric_value_counts(value_counts, column, values):
+    """
+    Fold one chunk of a numerical column into its value counts, keyed by text so they can be merged with chunks read
+    as text. Counting stops (the entry becomes None) past MAX_NUMERIC_VALUE_COUNTS distinct values.
+    """
+    if column in value_counts and value_counts[column] is None:
+        return
+    counts = values.value_counts()
+    if len(counts) > MAX_NUMERIC_VALUE_COUNTS:
+        value_counts[column] = None
+        return
+    counts = counts_by_text(counts)
+    previous = value_counts.get(column)
+    counts = counts if previous is None else previous.add(counts, fill_value=0)
+    value_counts[column] = counts if len(counts) <= MAX_NUMERIC_VALUE_COUNTS else None
+
+def profile_numerical_column(values):
+    """
+    Compute missing count and describe() statistics of a numerical column from a single array.
+    Accepts a Series or a float64 array with NaN marking missing values.
+    """
+    x = values if isinstance(values, np.ndarray) else values.to_numpy(dtype='float64', na_value=np.nan)
+    valid = x[~np.isnan(x)]
+    missing = len(x) - len(valid)
+    if len(valid) == 0:
+        return missing, [0.0] + [np.nan] * 7
+
+    low, q25, q50, q75, high = np.percentile(valid, [0, 25, 50, 75, 100])
+    std = valid.std(ddof=1) if len(valid) > 1 else np.nan
+    return missing, [float(len(valid)), valid.mean(), std, low, q25, q50, q75, high]
+
+def categorical_codes(values):
+    """
+    Integer codes (-1 where missing) and categories of a categorical column: its categories if it has a categorical
+    dtype, otherwise its distinct values in order of first appearance.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories
+    return pd.factorize(values)
+
+def categorical_value_counts(counts, uniques, name):
+    """
+    Value counts of a categorical column from the count of each of its categories, most frequent first.
+    """
+    # A stable sort keeps ties in order of first appearance, like value_counts()
+    order = np.argsort(-counts, kind='stable')
+    return pd.Series(counts[order], index=pd.Index(uniques.take(order), name=name), name='count')
+
+def profile_categorical_column(values):
+    """
+    Compute missing count and value counts of a categorical column from a single factorization.
+    """
+    codes, uniques = categorical_codes(values)
+    observed = codes[codes >= 0]
+    counts = np.bincount(observed, minlength=len(uniques))
+    return len(codes) - len(observed), categorical_value_counts(counts, uniques, values.name)
+
+def split_evenly(items, n_parts):
+    """
+    Split a list into at most `n_parts` contiguous, non-empty parts of nearly equal size.
+    """
+    bounds = np.linspace(0, len(items), min(n_parts, len(items)) + 1).astype(int)
+    return [items[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+def profile_numerical_shard(shm_name, shape, positions):
+    """
+    Worker task: profile some columns of the numerical matrix held in shared memory.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    matrix = np.ndarray(shape, dtype='float64', buffer=shm.buf, order='F')
+    results = [profile_numerical_column(matrix[:, position]) for position in positions]
+    del matrix
+    shm.close()
+    return results
+
+def count_categories_shard(shm_name, shape, positions, n_categories):
+    """
+    Worker task: missing count and category counts of some columns of the categorical code matrix held in shared memory.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    matrix = np.ndarray(shape, dtype=np.intp, buffer=shm.buf, order='F')
+    results = []
+    for position in positions:
+        codes = matrix[:, position]
+        observed = codes[codes >= 0]
+        results.append((len(codes) - len(observed), np.bincount(observed, minlength=n_categories[position])))
+    del matrix, codes, observed
+    shm.close()
+    return results
+
+def build_profile(df, missing, numerical_summary, value_counts):
+    """
+    Assemble the per-column results into the profile dictionary.
+    """
+    return {
+        'n_rows': df.shape[0],
+        'columns': df.columns.tolist(),
+        'dtypes': df.dtypes,
+        'missing': pd.Series(missing, index=df.columns, dtype='int64'),
+        'describe': pd.DataFrame(numerical_summary, index=DESCRIBE_INDEX),
+        'value_counts': value_counts,
+        'numerical_columns': list(numerical_summary),
+        'categorical_columns': list(value_counts),
+    }
+
+def shared_matrix(shape, dtype):
+    """
+    A Fortran-ordered matrix in a new shared-memory block, so each column is one contiguous buffer workers can read.
+    """
+    shm = shared_memory.SharedMemory(create=True, size=max(np.dtype(dtype).itemsize * shape[0] * shape[1], 1))
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf, order='F')
+
+def profile_dataframe_parallel(df, n_jobs):
+    """
+    Profile the dataframe with columns sharded across `n_jobs` worker processes.
+    Numerical columns are copied once into a shared-memory float64 matrix, and categorical columns are factorized
+    once into a shared-memory matrix of integer codes; workers read both without pickling and return per-column
+    results, and only the small category arrays stay behind to label the counts. The result is identical to the
+    serial profile.
+    """
+    numerical_columns = [column for column in df.columns if is_numerical(df[column])]
+    categorical_columns = [column for column in df.columns
+                           if column not in numerical_columns and is_categorical(df[column])]
+    numerical_shape = (df.shape[0], len(numerical_columns))
+    categorical_shape = (df.shape[0], len(categorical_columns))
+    numerical_shm, matrix = shared_matrix(numerical_shape, 'float64')
+    categorical_shm = None
+    try:
+        for position, column in enumerate(numerical_columns):
+            matrix[:, position] = df[column].to_numpy(dtype='float64', na_value=np.nan)
+        categorical_shm, codes = shared_matrix(categorical_shape, np.intp)
+        categories = []
+        for position, column in enumerate(categorical_columns):
+            codes[:, position], uniques = categorical_codes(df[column])
+            categories.append(uniques)
+        del matrix, codes
+        n_categories = [len(uniques) for uniques in categories]
+
+        with ProcessPoolExecutor(n_jobs) as executor:
+            numerical_futures = [executor.submit(profile_numerical_shard, numerical_shm.name, numerical_shape, positions)
+                                 for positions in split_evenly(list(range(len(numerical_columns))), n_jobs)]
+            categorical_futures = [executor.submit(count_categories_shard, categorical_shm.name, categorical_shape,
+                                                   positions, n_categories)
+                                   for positions in split_evenly(list(range(len(categorical_columns))), n_jobs)]
+            numerical_results = [result for future in numerical_futures for result in future.result()]
+            categorical_results = [result for future in categorical_futures for result in future.result()]
+    finally:
+        for shm in (numerical_shm, categorical_shm):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+    missing = {}
+    numerical_summary = {}
+    value_counts = {}
+    for column, (column_missing, stats) in zip(numerical_columns, numerical_results):
+        missing[column], numerical_summary[column] = column_missing, stats
+    for column, uniques, (column_missing, counts) in zip(categorical_columns, categories, categorical_results):
+        missing[column], value_counts[column] = column_missing, categorical_value_counts(counts, uniques, column)
+    for column in df.columns:
+        if column not in missing:
+            missing[column] = int(df[column].isnull().sum())
+    return build_profile(df, missing, numerical_summary, value_counts)
+
+def profile_dataframe(df, n_jobs=1, approximate=False):
+    """
+    Profile every column of the dataframe in a single pass.
+    Returns a dictionary with the row count, column names, dtypes, missing counts, the describe() table of numerical
+    columns and the value counts of categorical columns, which the reporting functions render instead of recomputing.
+    With `n_jobs` > 1 the columns are profiled by a pool of worker processes.
+    With `approximate`, quartiles and value counts come from bounded-memory sketches (see sketch_dataframe).
+    """
+    if approximate:
+        return profile_from_sketches(sketch_dataframe(df))
+    if n_jobs > 1:
+        return profile_dataframe_parallel(df, n_jobs)
+
+    missing = {}
+    numerical_summary = {}
+    value_counts = {}
+
+    for column in df.columns:
+        values = df[column]
+        if is_numerical(values):
+            missing[column], numerical_summary[column] = profile_numerical_column(values)
+        elif is_categorical(values):
+            missing[column], value_counts[column] = profile_categorical_column(values)
+        else:
+            missing[column] = int(values.isnull().sum())
+
+    return build_profile(df, missing, numerical_summary, value_counts)
+
+def sketch_dataframe(df, rank_error=0.013, distinct_error=0.01, frequency_error=0.001):
+    """
+    Summarise every column of a dataframe with bounded-memory sketches: moments and a quantile sketch for numerical
+    columns, a heavy-hitters sketch for categorical ones, and missing and distinct counts for all of them.
+    Numerical columns with few enough distinct values for the heavy-hitters sketch to count them all also keep one,
+    so a partition where the column is read as numbers can still be counted when another partition reads it as text
+    (see merge_column_sketches).
+    """
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        summary = {'dtype': str(values.dtype), 'missing': int(values.isnull().sum()),
+                   'distinct': sketches.update_distinct_sketch(sketches.new_distinct_sketch(distinct_error), values)}
+        if is_numerical(values):
+            x = values.to_numpy(dtype='float64', na_value=np.nan)
+            summary['kind'] = 'numerical'
+            summary['moments'] = sketches.update_moments(sketches.new_moments(), x)
+            summary['quantiles'] = sketches.update_quantile_sketch(sketches.new_quantile_sketch(rank_error), x)
+            heavy_hitters = sketches.new_heavy_hitters_sketch(frequency_error)
+            if sketches.query_distinct(summary['distinct']) <= heavy_hitters['capacity']:
+                summary['heavy_hitters'] = sketches.update_heavy_hitters(heavy_hitters, values)
+        elif is_categorical(values):
+            summary['kind'] = 'categorical'
+            summary['heavy_hitters'] = sketches.update_heavy_hitters(sketches.new_heavy_hitters_sketch(frequency_error), values)
+        else:
+            summary['kind'] = 'other'
+        columns[column] = summary
+    return {'n_rows': df.shape[0], 'columns': columns}
+
+def text_heavy_hitters(sketch):
+    """
+    A heavy-hitters sketch of numbers re-keyed by their text (see as_text), so it merges with one of a text column.
+    """
+    return sketches.reduce_heavy_hitters(dict(sketch), counts_by_text(sketch['counts']).astype('int64'))
+
+def as_categorical_sketch(summary):
+    """
+    The sketches of a column partition that still apply once the column is profiled as text: missing and distinct
+    counts, and the heavy hitters, re-keyed by text if the partition was read as numbers.
+    """
+    categorical = {key: summary[key] for key in ('dtype', 'missing', 'distinct', 'heavy_hitters') if key in summary}
+    if summary['kind'] == 'numerical' and 'heavy_hitters' in summary:
+        categorical['heavy_hitters'] = text_heavy_hitters(summary['heavy_hitters'])
+    return categorical
+
+def merge_column_sketches(column, a, b):
+    """
+    Merge the sketches of one column in two partitions. A column read as numbers in one partition and as text in
+    the other becomes categorical, with a warning: its numerical sketches are dropped and the counts of its numbers
+    are merged into the value counts by text, unless a numerical partition had too many distinct values to keep them.
+    Any other change of kind leaves only missing and distinct counts.
+    """
+    merge_functions = {'moments': sketches.merge_moments, 'quantiles': sketches.merge_quantile_sketches,
+                       'distinct': sketches.merge_distinct_sketches, 'heavy_hitters': sketches.merge_heavy_hitters}
+    kind = a['kind']
+    if a['kind'] != b['kind']:
+        if {a['kind'], b['kind']} == {'numerical', 'categorical'}:
+            warnings.warn("Column {} is read as numbers in some partitions and as text in others; "
+                          "it is profiled as text.".format(column))
+            kind = 'categorical'
+            a, b = as_categorical_sketch(a), as_categorical_sketch(b)
+            if 'heavy_hitters' not in a or 'heavy_hitters' not in b:
+                warnings.warn("Value counts of column {} leave out the partitions read as numbers, which had too many "
+                              "distinct values to count.".format(column))
+        else:
+            kind = 'other'
+            a, b = ({key: summary[key] for key in ('dtype', 'missing', 'distinct')} for summary in (a, b))
+    merged = {'dtype': a['dtype'] if a['dtype'] == b['dtype'] else 'object',
+              'missing': a['missing'] + b['missing'], 'kind': kind}
+    for key, merge in merge_functions.items():
+        if key in a and key in b:
+            merged[key] = merge(a[key], b[key])
+    if kind == 'categorical' and 'heavy_hitters' not in merged:
+        merged['heavy_hitters'] = a.get('heavy_hitters', b.get('heavy_hitters'))
+    return merged
+
+def merge_dataset_sketches(left, right):
+    """
+    Merge the sketches of two partitions of the same dataset.
+    Columns present in only one partition are kept; see merge_column_sketches for columns whose kind differs.
+    """
+    columns = {}
+    for column in list(left['columns']) + [c for c in right['columns'] if c not in left['columns']]:
+        if column not in right['columns'] or column not in left['columns']:
+            columns[column] = left['columns'].get(column, right['columns'].get(column))
+            continue
+        columns[column] = merge_column_sketches(column, left['columns'][column], right['columns'][column])
+    return {'n_rows': left['n_rows'] + right['n_rows'], 'columns': columns}
+
+def profile_from_sketches(dataset_sketch, top=None):
+    """
+    Build a profile in the layout of profile_dataframe from dataset sketches.
+    Quartiles, distinct counts and value counts are approximate; the profile also holds the estimated distinct count
+    of every column under 'distinct'.
+    """
+    columns = dataset_sketch['columns']
+    numerical_summary = {}
+    value_counts = {}
+    for column, summary in columns.items():
+        if summary['kind'] == 'numerical':
+            moments = summary['moments']
+            count = moments['count']
+            std = math.sqrt(moments['m2'] / (count - 1)) if count > 1 else np.nan
+            low, q25, q50, q75, high = sketches.query_quantiles(summary['quantiles'], [0, 0.25, 0.5, 0.75, 1])
+            numerical_summary[column] = [float(count), moments['mean'] if count else np.nan, std, low, q25, q50, q75, high]
+        elif summary['kind'] == 'categorical':
+            counts = sketches.query_heavy_hitters(summary['heavy_hitters'], top).copy()
+            counts.index.name = column
+            counts.name = 'count'
+            value_counts[column] = counts
+
+    return {
+        'n_rows': dataset_sketch['n_rows'],
+        'columns': list(columns),
+        'dtypes': pd.Series({column: summary['dtype'] for column, summary in columns.items()}, dtype='object'),
+        'missing': pd.Series({column: summary['missing'] for column, summary in columns.items()}, dtype='int64'),
+        'describe': pd.DataFrame(numerical_summary, index=DESCRIBE_INDEX),
+        'value_counts': value_counts,
+        'numerical_columns': list(numerical_summary),
+        'categorical_columns': list(value_counts),
+        'distinct': pd.Series({column: round(sketches.query_distinct(summary['distinct'])) for column, summary in columns.items()},
+                              dtype='int64'),
+    }
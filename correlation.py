@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+# Pearson correlation with pairwise deletion, accumulated chunk by chunk. For every pair of columns (i, j) the state
+# holds, over the rows where both are present: the row count, the sums of x_i, the sums of x_i ** 2 and the sums of
+# x_i * x_j. Each statistic is a matrix product of the zero-filled data and its presence mask, taken one block of
+# columns at a time. Values are shifted by a per-column offset taken from the first chunk, so the sums stay small
+# and the final differences do not cancel catastrophically.
+
+def new_correlation_state(columns):
+    """
+    Empty accumulator for the pairwise correlations of the given columns.
+    """
+    p = len(columns)
+    return {'columns': list(columns), 'shift': None, 'n': np.zeros((p, p)), 'sum': np.zeros((p, p)),
+            'sum_squares': np.zeros((p, p)), 'cross': np.zeros((p, p))}
+
+def column_blocks(p, block_size):
+    """
+    Consecutive slices covering range(p), each at most `block_size` long.
+    """
+    return [slice(start, min(start + block_size, p)) for start in range(0, p, block_size)]
+
+def update_correlation_state(state, chunk, block_size=256):
+    """
+    Add a chunk of rows (a dataframe holding the state's columns) to a correlation accumulator.
+    """
+    x = chunk[state['columns']].to_numpy(dtype='float64', na_value=np.nan)
+    present = ~np.isnan(x)
+    if state['shift'] is None:
+        counts = present.sum(axis=0)
+        state['shift'] = np.where(present, x, 0.0).sum(axis=0) / np.maximum(counts, 1)
+    centered = np.where(present, x - state['shift'], 0.0)
+    mask = present.astype('float64')
+    squares = centered ** 2
+
+    blocks = column_blocks(x.shape[1], block_size)
+    for i in blocks:
+        for j in blocks:
+            state['n'][i, j] += mask[:, i].T @ mask[:, j]
+            state['sum'][i, j] += centered[:, i].T @ mask[:, j]
+            state['sum_squares'][i, j] += squares[:, i].T @ mask[:, j]
+            state['cross'][i, j] += centered[:, i].T @ centered[:, j]
+    return state
+
+def finalize_correlation(state, min_periods=1):
+    """
+    Correlation matrix of an accumulator, as a dataframe like DataFrame.corr().
+    Pairs observed together in fewer than `min_periods` rows, or with zero variance, are NaN.
+    """
+    n, sum_i = state['n'], state['sum']
+    sum_j = sum_i.T
+    with np.errstate(invalid='ignore', divide='ignore'):
+        covariance = n * state['cross'] - sum_i * sum_j
+        variance_i = n * state['sum_squares'] - sum_i ** 2
+        variance_j = variance_i.T
+        correlation = covariance / np.sqrt(variance_i * variance_j)
+    valid = (n >= max(min_periods, 2)) & (variance_i > 0) & (variance_j > 0)
+    correlation = np.where(valid, np.clip(correlation, -1, 1), np.nan)
+    np.fill_diagonal(correlation, np.where(np.diag(valid), 1.0, np.nan))
+    return pd.DataFrame(correlation, index=state['columns'], columns=state['columns'])
+
+def streaming_correlation(chunks, columns=None, block_size=256, min_periods=1):
+    """
+    Pearson correlation matrix of an iterable of dataframe chunks, such as data_loader.iter_chunks,
+    with missing values deleted pairwise. `columns` defaults to the numerical columns of the first chunk.
+    """
+    state = None
+    for chunk in chunks:
+        if state is None:
+            if columns is None:
+                columns = chunk.select_dtypes(include=['number']).columns
+            state = new_correlation_state(columns)
+        update_correlation_state(state, chunk, block_size)
+    if state is None:
+        state = new_correlation_state(columns if columns is not None else [])
+    return finalize_correlation(state, min_periods)
+
+def correlation_matrix(df, columns=None, chunksize=100000, block_size=256, min_periods=1):
+    """
+    Pearson correlation matrix of an in-memory dataframe, accumulated over chunks of `chunksize` rows.
+    """
+    if columns is None:
+        columns = df.select_dtypes(include=['number']).columns
+    chunks = (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+    return streaming_correlation(chunks, columns, block_size, min_periods)
+
+def correlation_with_counts(df, columns=None, chunksize=100000, block_size=256, min_periods=1):
+    """
+    Pearson correlation matrix of an in-memory dataframe (see correlation_matrix), together with the matrix of
+    pairwise-complete row counts it was computed from.
+    """
+    if columns is None:
+        columns = df.select_dtypes(include=['number']).columns
+    state = new_correlation_state(columns)
+    for start in range(0, len(df), chunksize):
+        update_correlation_state(state, df.iloc[start:start + chunksize], block_size)
+    return finalize_correlation(state, min_periods), state['n']
+
+def top_correlated(correlation, top_k):
+    """
+    The `top_k` variables with the strongest correlation to any other variable, reordered by average-linkage
+    clustering on 1 - |r| so that correlated variables sit next to each other.
+    """
+    strength = correlation.abs().where(~np.eye(len(correlation), dtype=bool)).max().fillna(0)
+    keep = strength.sort_values(ascending=False, kind='stable').index[:top_k]
+    reduced = correlation.loc[keep, keep]
+    if len(keep) < 3:
+        return reduced
+
+    from scipy.cluster.hierarchy import leaves_list, linkage
+    from scipy.spatial.distance import squareform
+
+    distance = 1 - reduced.abs().fillna(0).to_numpy()
+    np.fill_diagonal(distance, 0)
+    order = leaves_list(linkage(squareform(distance, checks=False), method='average'))
+    return reduced.iloc[order, order]
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = '.eda_cache'
+
+# Fingerprints already computed in this process, keyed on path, size and modification time
+_fingerprints = {}
+
+def file_fingerprint(file_path, block_size=1 << 20):
+    """
+    Fingerprint a file on its absolute path, size, modification time and content hash.
+    The content hash is computed once per process for an unchanged file.
+    """
+    stat = os.stat(file_path)
+    stat_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    if stat_key in _fingerprints:
+        return _fingerprints[stat_key]
+
+    content_hash = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            content_hash.update(block)
+
+    key = hashlib.blake2b(digest_size=16)
+    key.update(os.path.abspath(file_path).encode())
+    key.update(str(stat.st_size).encode())
+    key.update(str(stat.st_mtime_ns).encode())
+    key.update(content_hash.digest())
+    _fingerprints[stat_key] = key.hexdigest()
+    return _fingerprints[stat_key]
+
+def get_cache_path(file_path, cache_dir=CACHE_DIR, suffix='.parquet', fingerprint=None):
+    """
+    Path of a cache file for a dataset: the columnar copy by default, or a sidecar such as the dtype schema.
+    """
+    if fingerprint is None:
+        fingerprint = file_fingerprint(file_path)
+    return os.path.join(cache_dir, fingerprint + suffix)
+
+def write_cache(df, cached_path):
+    """
+    Write the dataframe to the Parquet cache.
+    The file is written under a temporary name first so an interrupted run never leaves a partial cache behind.
+    """
+    os.makedirs(os.path.dirname(cached_path) or '.', exist_ok=True)
+    tmp_path = cached_path + '.tmp'
+    try:
+        df.to_parquet(tmp_path, index=False)
+    except (ImportError, ValueError, TypeError) as e:
+        # No Parquet engine installed, or a column Arrow cannot store; keep working from the CSV
+        print("Could not write dataset cache: {}".format(e))
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, cached_path)
+    return True
+
+def infer_dtype_schema(df, max_unique_ratio=0.05):
+    """
+    Infer the narrowest lossless dtype for each column.
+    Integers are downcast to the smallest integer type that holds them, floats become float32 only when every value round-trips exactly,
+    and string columns with at most `max_unique_ratio` distinct values per row become categoricals; with more,
+    the category dictionary costs about as much as the strings it replaces.
+    Only columns whose dtype changes appear in the returned schema.
+    """
+    schema = {}
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_bool_dtype(values):
+            continue
+        if pd.api.types.is_integer_dtype(values):
+            dtype = pd.to_numeric(values, downcast='integer').dtype
+        elif pd.api.types.is_float_dtype(values):
+            x = values.to_numpy(dtype='float64')
+            lossless = np.array_equal(x.astype('float32').astype('float64'), x, equal_nan=True)
+            dtype = np.dtype('float32') if lossless else values.dtype
+        elif pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+            n_unique = values.nunique(dropna=True)
+            dtype = 'category' if len(values) > 0 and n_unique / len(values) <= max_unique_ratio else values.dtype
+        else:
+            continue
+        if str(dtype) != str(values.dtype):
+            schema[column] = str(dtype)
+    return schema
+
+def load_dtype_schema(schema_path):
+    """
+    Read a persisted dtype schema, or return an empty one.
+    """
+    if not os.path.exists(schema_path):
+        return {'inferred': [], 'dtypes': {}}
+    with open(schema_path) as f:
+        return json.load(f)
+
+def save_dtype_schema(schema, schema_path):
+    """
+    Persist a dtype schema next to the dataset cache.
+    """
+    os.makedirs(os.path.dirname(schema_path) or '.', exist_ok=True)
+    with open(schema_path, 'w') as f:
+        json.dump(schema, f, indent=2)
+
+def memory_report(before, after):
+    """
+    Compare the memory footprint of a dataframe before and after dtype optimisation.
+    """
+    report = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'dtype_after': after.dtypes.astype(str),
+        'bytes_before': before.memory_usage(deep=True, index=False),
+        'bytes_after': after.memory_usage(deep=True, index=False),
+    })
+    total_before = report['bytes_before'].sum()
+    total_after = report['bytes_after'].sum()
+    print("\nMemory usage by column:")
+    print(report[report['dtype_before'] != report['dtype_after']])
+    print("Total memory: {:.2f} MB -> {:.2f} MB ({:.1%} saved)".format(
+        total_before / 1e6, total_after / 1e6, 1 - total_after / total_before if total_before else 0))
+    return report
+
+def optimize_dtypes(df, schema_path, max_unique_ratio=0.05):
+    """
+    Apply the persisted dtype schema, inferring and saving it first for columns not seen before.
+    Prints a before/after memory report whenever inference runs.
+    """
+    schema = load_dtype_schema(schema_path)
+    new_columns = [column for column in df.columns if column not in schema['inferred']]
+    if new_columns:
+        schema['dtypes'].update(infer_dtype_schema(df[new_columns], max_unique_ratio))
+        schema['inferred'].extend(new_columns)
+        save_dtype_schema(schema, schema_path)
+
+    dtypes = {column: dtype for column, dtype in schema['dtypes'].items() if column in df.columns}
+    optimized = df.astype(dtypes)
+    if new_columns:
+        memory_report(df, optimized)
+    return optimized
+
+def load_dataset(file_path, columns=None, use_cache=True, cache_dir=CACHE_DIR, optimize=False):
+    """
+    Load the dataset from a CSV file.
+    The first load parses the CSV and writes a Parquet cache keyed on the file fingerprint.
+    Later loads memory-map the cache and read only the requested columns.
+    With `optimize`, columns are converted to categoricals and narrow numeric types using a schema inferred once and persisted.
+    """
+    start = time.perf_counter()
+    # Hashing the file is only needed to key the Parquet cache and the persisted dtype schema
+    fingerprint = file_fingerprint(file_path) if use_cache or optimize else None
+    cached_path = get_cache_path(file_path, cache_dir, fingerprint=fingerprint) if use_cache else None
+
+    if cached_path is not None and os.path.exists(cached_path):
+        df = pd.read_parquet(cached_path, columns=columns, memory_map=True)
+        load_kind = 'warm'
+    else:
+        df = pd.read_csv(file_path)
+        if cached_path is not None:
+            write_cache(df, cached_path)
+        if columns is not None:
+            df = df[list(columns)]
+        load_kind = 'cold' if use_cache else 'uncached'
+
+    if optimize:
+        schema_path = get_cache_path(file_path, cache_dir, suffix='.schema.json', fingerprint=fingerprint)
+        df = optimize_dtypes(df, schema_path)
+
+    elapsed = time.perf_counter() - start
+    print("Loaded {} ({} load) in {:.3f}s".format(file_path, load_kind, elapsed))
+    return df
+
+def iter_chunks(file_path, chunksize=100000, columns=None, use_cache=True, cache_dir=CACHE_DIR):
+    """
+    Iterate over the dataset in dataframes of at most `chunksize` rows.
+    Reads from the Parquet cache when one exists, otherwise streams the CSV; the whole table is never held in memory.
+    """
+    cached_path = get_cache_path(file_path, cache_dir) if use_cache else None
+    if cached_path is not None and os.path.exists(cached_path):
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(cached_path, memory_map=True)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        for chunk in pd.read_csv(file_path, chunksize=chunksize, usecols=columns):
+            yield chunk
@@ -0,0 +1,143 @@
+import json
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.2
+    guess_datetime_format = None
+
+CANDIDATE_FORMATS = [
+    '%Y-%m-%d', '%Y/%m/%d', '%m/%d/%Y', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%Y%m%d',
+    '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%m/%d/%Y %H:%M', '%d/%m/%Y %H:%M',
+    '%d %b %Y', '%b %d, %Y', '%d-%b-%Y',
+]
+
+def find_date_columns(df):
+    """
+    Columns whose name contains 'date'.
+    """
+    return [column for column in df.columns if 'date' in str(column).lower()]
+
+def infer_date_format(values, sample_size=1000, random_state=0):
+    """
+    Infer the strftime format of a string column from a sample of its distinct values.
+    Returns the format that parses the most sampled values and the fraction it parses;
+    a fraction below 1 means the column mixes several formats.
+    """
+    uniques = pd.Series(pd.unique(values.dropna().astype(str)))
+    if len(uniques) == 0:
+        return None, 0.0
+    sample = uniques.sample(min(sample_size, len(uniques)), random_state=random_state)
+
+    candidates = []
+    if guess_datetime_format is not None:
+        with warnings.catch_warnings():
+            # pandas warns when the guessed format is day-first; the guess is only a candidate here
+            warnings.simplefilter('ignore', UserWarning)
+            candidates += [guess for guess in sample.head(20).map(guess_datetime_format).dropna().unique()]
+    candidates += [fmt for fmt in CANDIDATE_FORMATS if fmt not in candidates]
+
+    best_format, best_fraction = None, 0.0
+    for fmt in candidates:
+        fraction = pd.to_datetime(sample, format=fmt, errors='coerce').notna().mean()
+        if fraction > best_fraction:
+            best_format, best_fraction = fmt, fraction
+            if fraction == 1.0:
+                break
+    return best_format, best_fraction
+
+def infer_date_formats(df, date_columns, sample_size=1000):
+    """
+    Infer the format of each date column, reporting columns whose sample mixes formats.
+    """
+    date_formats = {}
+    for column in date_columns:
+        fmt, fraction = infer_date_format(df[column], sample_size)
+        if fmt is None:
+            print("\nColumn {}: no known date format matches; values will be parsed element by element.".format(column))
+        elif fraction < 1.0:
+            print("\nColumn {}: mixed date formats, '{}' matches only {:.1%} of sampled values.".format(column, fmt, fraction))
+        date_formats[column] = fmt
+    return date_formats
+
+def load_date_formats(schema_path):
+    """
+    Read the cached date formats, or return an empty mapping.
+    """
+    if not os.path.exists(schema_path):
+        return {}
+    with open(schema_path) as f:
+        return json.load(f)
+
+def save_date_formats(date_formats, schema_path):
+    """
+    Cache the inferred date formats for later runs.
+    """
+    os.makedirs(os.path.dirname(schema_path) or '.', exist_ok=True)
+    with open(schema_path, 'w') as f:
+        json.dump(date_formats, f, indent=2)
+
+def parse_unique_dates(column, uniques, fmt):
+    """
+    Parse an array of distinct date strings with the given format.
+    Values that do not match are parsed element by element; returns the parsed array and the values that match no format.
+    """
+    if fmt is None:
+        parsed = pd.to_datetime(uniques, format='mixed', errors='coerce')
+        return column, parsed.to_numpy(dtype='datetime64[ns]'), uniques[parsed.isna()]
+
+    parsed = pd.to_datetime(uniques, format=fmt, errors='coerce')
+    mismatched = parsed.isna()
+    if mismatched.any():
+        fallback = pd.to_datetime(uniques[mismatched], format='mixed', errors='coerce')
+        parsed = parsed.to_numpy(dtype='datetime64[ns]')
+        parsed[mismatched] = fallback.to_numpy(dtype='datetime64[ns]')
+        return column, parsed, uniques[mismatched][fallback.isna()]
+    return column, parsed.to_numpy(dtype='datetime64[ns]'), uniques[:0]
+
+def parse_date_columns(df, date_formats, executor=None):
+    """
+    Convert the date columns of a dataframe using their known formats.
+    Each column is factorized so only distinct strings are parsed, then the results are mapped back through the codes.
+    Distinct values of different columns are parsed in parallel when a process `executor` is given.
+    """
+    factorized = {}
+    for column, fmt in date_formats.items():
+        if column in df.columns and not pd.api.types.is_datetime64_any_dtype(df[column]):
+            codes, uniques = pd.factorize(df[column])
+            factorized[column] = (codes, np.asarray(uniques, dtype=object))
+    if not factorized:
+        return df
+
+    jobs = [(column, uniques, date_formats[column]) for column, (codes, uniques) in factorized.items()]
+    if executor is None:
+        results = [parse_unique_dates(*job) for job in jobs]
+    else:
+        results = executor.map(parse_unique_dates, *zip(*jobs))
+
+    parsed_columns = {}
+    for column, parsed, unparsed in results:
+        codes = factorized[column][0]
+        if len(unparsed) > 0:
+            print("\nColumn {}: {} distinct values could not be parsed as dates, e.g. {}".format(
+                column, len(unparsed), list(unparsed[:3])))
+        # Code -1 marks a missing value and picks the trailing NaT
+        parsed_columns[column] = np.append(parsed, np.datetime64('NaT', 'ns'))[codes]
+    return df.assign(**parsed_columns)
+
+def resolve_date_formats(df, schema_path=None, sample_size=1000):
+    """
+    Formats of the date columns of `df`, inferring from its values only those not already cached at `schema_path`.
+    """
+    date_columns = find_date_columns(df)
+    date_formats = load_date_formats(schema_path) if schema_path is not None else {}
+    new_columns = [column for column in date_columns if column not in date_formats]
+    if new_columns:
+        date_formats.update(infer_date_formats(df, new_columns, sample_size))
+        if schema_path is not None:
+            save_date_formats(date_formats, schema_path)
+    return {column: date_formats[column] for column in date_columns}
@@ -0,0 +1,107 @@
+import numpy as np
+from sklearn.decomposition import PCA, IncrementalPCA
+from sklearn.preprocessing import StandardScaler
+
+from data_loader import CACHE_DIR
+from distribution_summaries import SUMMARY_FORMAT_VERSION, dataframe_fingerprint, load_or_compute
+
+# Above this many columns, PCA with method='auto' uses a randomized SVD instead of a full one
+RANDOMIZED_COLUMN_THRESHOLD = 500
+
+# Standardized matrices already built in this process, keyed on dataset fingerprint and dtype
+_matrices = {}
+
+def standardized_matrix(df, columns=None, dtype='float64'):
+    """
+    The numerical columns of a dataframe as a standardized matrix, built once per dataset content and dtype.
+    Rows with any missing value are left out; `rows` is the boolean mask of the rows kept, so results can be
+    aligned back to `df`. Columns are centred and scaled to unit variance as StandardScaler does (constant columns
+    are only centred). `dtype='float32'` halves the memory of the matrix; statistics are computed in float64.
+    """
+    if columns is None:
+        columns = df.select_dtypes(include=['number']).columns
+    columns = list(columns)
+    fingerprint = dataframe_fingerprint(df, columns, str(np.dtype(dtype)))
+    if fingerprint in _matrices:
+        return _matrices[fingerprint]
+
+    values = df[columns].to_numpy(dtype='float64', na_value=np.nan)
+    rows = ~np.isnan(values).any(axis=1)
+    values = values[rows]
+    mean = values.mean(axis=0) if len(values) else np.zeros(len(columns))
+    scale = values.std(axis=0) if len(values) else np.ones(len(columns))
+    scale[scale == 0] = 1
+    x = ((values - mean) / scale).astype(dtype, copy=False)
+    _matrices[fingerprint] = {'fingerprint': fingerprint, 'x': x, 'rows': rows, 'columns': columns,
+                              'mean': mean, 'scale': scale}
+    return _matrices[fingerprint]
+
+def pca_method(matrix, n_components, method='auto'):
+    """
+    The SVD used for a PCA: 'full', or 'randomized' for wide matrices when few components are wanted.
+    """
+    if method != 'auto':
+        return method
+    n_rows, n_columns = matrix['x'].shape
+    wide = n_columns > RANDOMIZED_COLUMN_THRESHOLD
+    return 'randomized' if wide and n_components < 0.8 * min(n_rows, n_columns) else 'full'
+
+def pca_key(matrix, n_components, method, random_state):
+    """
+    Cache key of a PCA fit: the summary format version, the standardized matrix it is fitted on and its parameters.
+    """
+    return '{}-{}-{}-{}-v{}'.format(matrix['fingerprint'], n_components, method, random_state, SUMMARY_FORMAT_VERSION)
+
+def fit_pca(matrix, n_components=2, method='auto', random_state=0, cache_dir=CACHE_DIR):
+    """
+    Principal components of a standardized matrix (see standardized_matrix), fitted once per dataset content and
+    parameters and cached in this process and in `cache_dir`. `method` is 'full', 'randomized' (a randomized SVD,
+    much faster on wide data) or 'auto'. Returns the components, their explained variance and explained variance
+    ratio, and the matrix's columns.
+    """
+    method = pca_method(matrix, n_components, method)
+
+    def compute():
+        pca = PCA(n_components=n_components, svd_solver=method, random_state=random_state).fit(matrix['x'])
+        return {'components': pca.components_, 'mean': pca.mean_, 'explained_variance': pca.explained_variance_,
+                'explained_variance_ratio': pca.explained_variance_ratio_, 'columns': matrix['columns']}
+
+    return load_or_compute(pca_key(matrix, n_components, method, random_state), 'pca', compute, cache_dir)
+
+def pca_scores(pca, x):
+    """
+    Coordinates of the rows of a standardized matrix on fitted principal components.
+    """
+    return (np.asarray(x, dtype='float64') - pca['mean']) @ np.asarray(pca['components']).T
+
+def incremental_pca(chunks, columns=None, n_components=2, dtype='float64'):
+    """
+    Principal components of data too large for memory, fed chunk by chunk. `chunks` is a function returning a fresh
+    iterable of dataframe chunks, such as lambda: data_loader.iter_chunks(path); it is read twice, once to learn
+    the column means and scales and once to fit an IncrementalPCA on the standardized chunks. Rows with any
+    missing value are skipped, as in standardized_matrix. Chunks with fewer complete rows than `n_components` are
+    carried over into the next one, and a final remainder that never reaches that many rows is left out.
+    Returns the same fields as fit_pca, plus the standardization.
+    """
+    scaler = StandardScaler()
+    for chunk in chunks():
+        if columns is None:
+            columns = list(chunk.select_dtypes(include=['number']).columns)
+        values = chunk[columns].to_numpy(dtype='float64', na_value=np.nan)
+        values = values[~np.isnan(values).any(axis=1)]
+        if len(values):
+            scaler.partial_fit(values)
+
+    pca = IncrementalPCA(n_components=n_components)
+    pending = np.empty((0, len(columns)), dtype=dtype)
+    for chunk in chunks():
+        values = chunk[columns].to_numpy(dtype='float64', na_value=np.nan)
+        values = values[~np.isnan(values).any(axis=1)]
+        pending = np.concatenate([pending, scaler.transform(values).astype(dtype, copy=False)])
+        if len(pending) >= n_components:
+            pca.partial_fit(pending)
+            pending = pending[:0]
+
+    return {'components': pca.components_, 'mean': pca.mean_, 'explained_variance': pca.explained_variance_,
+            'explained_variance_ratio': pca.explained_variance_ratio_, 'columns': columns,
+            'standardization_mean': scaler.mean_, 'standardization_scale': scaler.scale_}
@@ -0,0 +1,146 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_loader import CACHE_DIR
+from kde import KDE_BINS, grouped_kde, kde
+from sketches import load_sketch, save_sketch
+
+# Box-plot whiskers reach the furthest value within this many interquartile ranges of the box, as in matplotlib
+WHISKER_RANGE = 1.5
+# The histogram KDE is evaluated on this many points between the column minimum and maximum, as seaborn's histplot does
+KDE_GRIDSIZE = 200
+# Violin KDEs are evaluated on this many points and extend this many bandwidths past the data, as seaborn's violinplot does
+VIOLIN_GRIDSIZE = 100
+VIOLIN_CUT = 2
+
+# Bump whenever a change to how summaries, KDEs or fits are computed changes their results, so cached ones are not reused
+SUMMARY_FORMAT_VERSION = 1
+
+# Summaries already computed in this process, keyed on dataset fingerprint and summary kind
+_summaries = {}
+
+def dataframe_fingerprint(df, columns, *params):
+    """
+    Fingerprint the content of the given columns of a dataframe, together with the summary format version and any
+    parameters the summaries depend on.
+    """
+    key = hashlib.blake2b(digest_size=16)
+    key.update(repr(SUMMARY_FORMAT_VERSION).encode())
+    for column in columns:
+        key.update(repr((column, str(df[column].dtype))).encode())
+    key.update(repr(params).encode())
+    if len(columns) > 0:
+        key.update(pd.util.hash_pandas_object(df[list(columns)], index=False).to_numpy().tobytes())
+    return key.hexdigest()
+
+def summarize_values(values, bins=20, with_kde=True):
+    """
+    Histogram, box-plot statistics and (unless `with_kde` is False) KDE of a numerical array, ignoring missing values.
+    Box-plot statistics follow matplotlib: linear-interpolated quartiles, whiskers at the furthest values within
+    WHISKER_RANGE interquartile ranges of the box, and fliers beyond them with their row positions.
+    """
+    x = np.asarray(values, dtype='float64')
+    rows = np.flatnonzero(~np.isnan(x))
+    x = x[rows]
+    if len(x) == 0:
+        return {'count': 0}
+
+    bin_counts, bin_edges = np.histogram(x, bins=bins)
+    q1, median, q3 = np.percentile(x, [25, 50, 75])
+    iqr = q3 - q1
+    inside = x[(x >= q1 - WHISKER_RANGE * iqr) & (x <= q3 + WHISKER_RANGE * iqr)]
+    whislo = min(q1, inside.min()) if len(inside) else q1
+    whishi = max(q3, inside.max()) if len(inside) else q3
+    flier = (x < whislo) | (x > whishi)
+    kde_x, kde_density = kde(x, KDE_GRIDSIZE) if with_kde else (np.empty(0), np.empty(0))
+
+    return {
+        'count': len(x), 'mean': float(x.mean()),
+        'bin_edges': bin_edges, 'bin_counts': bin_counts,
+        'q1': float(q1), 'median': float(median), 'q3': float(q3),
+        'whislo': float(whislo), 'whishi': float(whishi),
+        'fliers': x[flier], 'flier_rows': rows[flier],
+        'kde_x': kde_x, 'kde_density': kde_density,
+    }
+
+def load_or_compute(fingerprint, kind, compute, cache_dir=CACHE_DIR):
+    """
+    Summaries of the given kind for a fingerprinted dataset, from this process, from `cache_dir`, or computed and cached.
+    Pass cache_dir=None to keep them in memory only.
+    """
+    key = (fingerprint, kind)
+    if key in _summaries:
+        return _summaries[key]
+
+    cached_path = os.path.join(cache_dir, '{}.{}.json'.format(fingerprint, kind)) if cache_dir is not None else None
+    if cached_path is not None and os.path.exists(cached_path):
+        _summaries[key] = load_sketch(cached_path)
+        return _summaries[key]
+
+    _summaries[key] = compute()
+    if cached_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        save_sketch(_summaries[key], cached_path + '.tmp')
+        os.replace(cached_path + '.tmp', cached_path)
+    return _summaries[key]
+
+def distribution_summaries(df, columns=None, bins=20, cache_dir=CACHE_DIR):
+    """
+    Per-column summaries (see summarize_values) of the numerical columns of a dataframe, computed once per dataset content.
+    """
+    if columns is None:
+        columns = df.select_dtypes(include=['number']).columns
+    columns = list(columns)
+    fingerprint = dataframe_fingerprint(df, columns, bins, KDE_GRIDSIZE, KDE_BINS)
+    return load_or_compute(fingerprint, 'distributions',
+                           lambda: {column: summarize_values(df[column], bins) for column in columns}, cache_dir)
+
+def summarize_groups(df, numerical_column, categorical_column, bins=20):
+    """
+    Summaries of a numerical column within each category of another, categories in order of appearance.
+    Rows are sorted by category once, so each group is a contiguous slice; flier rows are positions in `df`.
+    The KDE of every group, on the violin-plot support, is computed in one batch (see kde.grouped_kde).
+    """
+    values = df[categorical_column]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, categories = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, categories = pd.factorize(values)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(categories) + 1))
+    x = df[numerical_column].to_numpy(dtype='float64', na_value=np.nan)[order]
+
+    grids, densities = grouped_kde(x, codes[order], len(categories), VIOLIN_GRIDSIZE, VIOLIN_CUT)
+
+    summaries = []
+    for k in range(len(categories)):
+        summary = summarize_values(x[bounds[k]:bounds[k + 1]], bins, with_kde=False)
+        if summary['count'] > 0:
+            summary['flier_rows'] = order[bounds[k] + summary['flier_rows']]
+            if not np.isnan(grids[k, 0]):
+                summary['kde_x'], summary['kde_density'] = grids[k], densities[k]
+        summaries.append(summary)
+    return {'categories': list(categories), 'summaries': summaries}
+
+def group_summaries(df, numerical_column, categorical_column, bins=20, cache_dir=CACHE_DIR):
+    """
+    Cached summaries of a numerical column by category (see summarize_groups).
+    """
+    fingerprint = dataframe_fingerprint(df, [numerical_column, categorical_column], bins, VIOLIN_GRIDSIZE, VIOLIN_CUT,
+                                       KDE_BINS)
+    return load_or_compute(fingerprint, 'groups',
+                           lambda: summarize_groups(df, numerical_column, categorical_column, bins), cache_dir)
+
+def box_stats(summary, label=None):
+    """
+    Box-plot statistics of a summary in the form matplotlib's Axes.bxp draws.
+    """
+    if summary['count'] == 0:
+        return {'label': label, 'med': np.nan, 'q1': np.nan, 'q3': np.nan, 'whislo': np.nan, 'whishi': np.nan,
+                'mean': np.nan, 'fliers': np.empty(0)}
+    return {'label': label, 'med': summary['median'], 'q1': summary['q1'], 'q3': summary['q3'],
+            'whislo': summary['whislo'], 'whishi': summary['whishi'], 'mean': summary['mean'],
+            'fliers': summary['fliers']}
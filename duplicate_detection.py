@@ -0,0 +1,154 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+FINGERPRINT_DTYPE = np.dtype([('high', '<u8'), ('low', '<u8'), ('row', '<i8')])
+
+def row_fingerprints(df, subset=None, offset=0):
+    """
+    Hash each row to a 128-bit fingerprint made of two independently keyed 64-bit hashes.
+    Only the `subset` columns are hashed when given; rows are numbered from `offset`.
+    """
+    if subset is not None:
+        df = df[list(subset)]
+    records = np.empty(len(df), dtype=FINGERPRINT_DTYPE)
+    records['high'] = pd.util.hash_pandas_object(df, index=False, hash_key='habs-eda-high-00').to_numpy()
+    # Hashing the columns in reverse order changes how the per-column hashes are combined
+    records['low'] = pd.util.hash_pandas_object(df[df.columns[::-1]], index=False, hash_key='habs-eda-low-000').to_numpy()
+    records['row'] = np.arange(offset, offset + len(df))
+    return records
+
+def duplicate_rows(records):
+    """
+    Row numbers of every fingerprint that repeats one with a lower row number.
+    """
+    order = np.lexsort((records['row'], records['low'], records['high']))
+    records = records[order]
+    repeated = (records['high'][1:] == records['high'][:-1]) & (records['low'][1:] == records['low'][:-1])
+    return records['row'][1:][repeated]
+
+def spill_partitions(buffers, spill_dir):
+    """
+    Append the buffered fingerprints of every partition to its file on disk and empty the buffers.
+    """
+    for partition, buffer in enumerate(buffers):
+        if buffer:
+            with open(os.path.join(spill_dir, '{}.bin'.format(partition)), 'ab') as f:
+                np.concatenate(buffer).tofile(f)
+            buffer.clear()
+
+def find_duplicates(chunks, subset=None, n_partitions=64, max_rows_in_memory=5000000, spill_dir=None):
+    """
+    Find duplicate rows in a stream of dataframes without holding the data in memory.
+    Each row is reduced to a 128-bit fingerprint and hash-partitioned; once more than `max_rows_in_memory`
+    fingerprints are buffered, the partitions are spilled to a temporary directory (under `spill_dir` when given).
+    Each partition is then deduplicated on its own.
+    Returns the sorted positions of the rows that repeat an earlier row (the first occurrence is kept).
+    """
+    buffers = [[] for _ in range(n_partitions)]
+    buffered = 0
+    offset = 0
+    partition_dir = None
+
+    try:
+        for chunk in chunks:
+            records = row_fingerprints(chunk, subset, offset)
+            offset += len(chunk)
+            partitions = records['high'] % n_partitions
+            order = np.argsort(partitions, kind='stable')
+            bounds = np.searchsorted(partitions[order], np.arange(n_partitions + 1))
+            for partition in range(n_partitions):
+                if bounds[partition] < bounds[partition + 1]:
+                    buffers[partition].append(records[order[bounds[partition]:bounds[partition + 1]]])
+            buffered += len(records)
+
+            if buffered > max_rows_in_memory:
+                if partition_dir is None:
+                    partition_dir = tempfile.mkdtemp(prefix='habs_duplicates_', dir=spill_dir)
+                spill_partitions(buffers, partition_dir)
+                buffered = 0
+
+        duplicates = []
+        for partition in range(n_partitions):
+            parts = buffers[partition]
+            spill_path = os.path.join(partition_dir, '{}.bin'.format(partition)) if partition_dir is not None else None
+            if spill_path is not None and os.path.exists(spill_path):
+                parts = [np.fromfile(spill_path, dtype=FINGERPRINT_DTYPE)] + parts
+            if parts:
+                duplicates.append(duplicate_rows(np.concatenate(parts)))
+            buffers[partition] = []
+    finally:
+        if partition_dir is not None:
+            shutil.rmtree(partition_dir, ignore_errors=True)
+
+    if not duplicates:
+        return np.empty(0, dtype=np.int64)
+    return np.sort(np.concatenate(duplicates))
+
+def new_seen_rows():
+    """
+    Empty record of the rows kept by drop_seen_rows: their fingerprints as sorted runs of (first half, second half),
+    each run at least twice as long as the next, and the number of rows dropped so far.
+    """
+    return {'runs': [], 'dropped': 0}
+
+def seen_before(runs, highs, lows):
+    """
+    Which of the fingerprints (sorted on their first half) are in any of the sorted runs.
+    """
+    found = np.zeros(len(highs), dtype=bool)
+    for run_highs, run_lows in runs:
+        left = np.searchsorted(run_highs, highs, side='left')
+        right = np.searchsorted(run_highs, highs, side='right')
+        single = right - left == 1
+        found[single] |= run_lows[left[single]] == lows[single]
+        # Distinct rows whose first halves collide, which almost never happens
+        for i in np.flatnonzero(right - left > 1):
+            found[i] |= np.any(run_lows[left[i]:right[i]] == lows[i])
+    return found
+
+def drop_seen_rows(seen, chunk, subset=None):
+    """
+    Drop the rows of a chunk that repeat an earlier row, in this chunk or in one passed before, and record the
+    fingerprints of the rows kept. Chunks passed in order through the same record lose the same rows as
+    find_duplicates and drop_rows would drop, in a single pass; the record takes 16 bytes per distinct row.
+    The fingerprints of each chunk are added as a sorted run and runs of similar length are merged, so a row is
+    looked up in a logarithmic number of runs and copied a logarithmic number of times.
+    """
+    records = row_fingerprints(chunk, subset)
+    # First occurrence of every fingerprint within the chunk; the sort is stable, so it comes first among its copies
+    highs, lows = records['high'].copy(), records['low'].copy()
+    order = np.lexsort((lows, highs))
+    highs, lows = highs[order], lows[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (highs[1:] != highs[:-1]) | (lows[1:] != lows[:-1])
+    order, highs, lows = order[first], highs[first], lows[first]
+
+    found = seen_before(seen['runs'], highs, lows)
+    keep = np.zeros(len(chunk), dtype=bool)
+    keep[order[~found]] = True
+    seen['dropped'] += int(len(chunk) - keep.sum())
+
+    runs = seen['runs']
+    runs.append((highs[~found], lows[~found]))
+    while len(runs) > 1 and len(runs[-2][0]) <= 2 * len(runs[-1][0]):
+        highs, lows = np.concatenate([runs[-2][0], runs[-1][0]]), np.concatenate([runs[-2][1], runs[-1][1]])
+        # Two sorted runs: the stable sort finds them and merges them in linear time
+        merged = np.argsort(highs, kind='stable')
+        runs[-2:] = [(highs[merged], lows[merged])]
+    return chunk[keep]
+
+def drop_rows(chunks, rows):
+    """
+    Drop the rows at the given sorted positions from a stream of dataframes.
+    """
+    offset = 0
+    for chunk in chunks:
+        start, stop = np.searchsorted(rows, [offset, offset + len(chunk)])
+        keep = np.ones(len(chunk), dtype=bool)
+        keep[rows[start:stop] - offset] = False
+        offset += len(chunk)
+        yield chunk[keep]
@@ -0,0 +1,360 @@
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+from scipy import sparse
+
+from column_profiler import split_evenly
+from correlation import correlation_with_counts
+
+# Integer codes of the categorical columns, set once per chi-square worker process by init_chi_square_worker
+_codes = None
+
+def adjust_p_values(p_values, method='fdr_bh'):
+    """
+    Adjust p-values for multiple testing: 'bonferroni' or 'fdr_bh' (Benjamini-Hochberg).
+    Missing p-values are left missing and do not count as tests.
+    """
+    p = np.asarray(p_values, dtype='float64')
+    adjusted = np.full(len(p), np.nan)
+    tested = np.flatnonzero(~np.isnan(p))
+    m = len(tested)
+    if m == 0:
+        return adjusted
+    if method == 'bonferroni':
+        adjusted[tested] = np.minimum(p[tested] * m, 1)
+    elif method == 'fdr_bh':
+        order = tested[np.argsort(p[tested], kind='stable')]
+        scaled = p[order] * m / np.arange(1, m + 1)
+        adjusted[order] = np.minimum(np.minimum.accumulate(scaled[::-1])[::-1], 1)
+    else:
+        raise ValueError(f"Unknown multiple-testing correction: {method}")
+    return adjusted
+
+def group_moments(filled, squares, present, codes, n_groups):
+    """
+    Count, mean and sum of squared deviations of every column within each group, as (n_groups, columns) matrices.
+    `filled` holds the values with missing entries set to 0, `squares` their squares and `present` marks the
+    non-missing ones, all C-contiguous; rows with code -1 are ignored. Each statistic is one product of a sparse
+    group-indicator matrix with the data. The values should be roughly centred beforehand so the sums of squares
+    do not lose precision.
+    """
+    rows = np.flatnonzero(codes >= 0)
+    indicator = sparse.csr_matrix((np.ones(len(rows)), (codes[rows], rows)), shape=(n_groups, len(codes)))
+    counts = indicator @ present
+    sums = indicator @ filled
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+        m2 = np.maximum(indicator @ squares - sums * means, 0)
+    return counts, means, m2
+
+def batch_t_tests(df, group_columns, value_columns, equal_var=True, max_groups=20):
+    """
+    Two-sample t-tests of every value column between every pair of groups of every grouping column.
+    Each grouping column is factorized once and the group moments of all value columns computed as matrices
+    (see group_moments), so the statistics of all pairs come from array arithmetic.
+    Grouping columns with more than `max_groups` groups are skipped. Uses Student's t-test, or Welch's with equal_var=False, ignoring missing values like
+    scipy.stats.ttest_ind(nan_policy='omit').
+    Returns one row per test with the group sizes and means, t statistic, degrees of freedom, p-value,
+    Cohen's d and Hedges' g, and Bonferroni and Benjamini-Hochberg adjusted p-values over all tests.
+    """
+    value_columns = list(value_columns)
+    x = df[value_columns].to_numpy(dtype='float64', na_value=np.nan)
+    present = ~np.isnan(x)
+    with np.errstate(invalid='ignore'):
+        shift = np.where(present, x, 0.0).sum(axis=0) / np.maximum(present.sum(axis=0), 1)
+    filled = np.ascontiguousarray(np.where(present, x - shift, 0.0))
+    squares = filled ** 2
+    present = np.ascontiguousarray(present, dtype='float64')
+    results = []
+    for group_column in group_columns:
+        codes, groups = pd.factorize(df[group_column])
+        if len(groups) > max_groups:
+            print(f"Skipping {group_column}: {len(groups)} groups is more than {max_groups}.")
+            continue
+        if len(groups) < 2:
+            continue
+        counts, means, m2 = group_moments(filled, squares, present, codes, len(groups))
+        means = means + shift
+
+        # Every pair of groups, in order of first appearance
+        first, second = np.triu_indices(len(groups), k=1)
+        n1, n2 = counts[first], counts[second]
+        mean1, mean2 = means[first], means[second]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            dof_pooled = n1 + n2 - 2
+            pooled_var = (m2[first] + m2[second]) / dof_pooled
+            if equal_var:
+                dof = dof_pooled
+                standard_error = np.sqrt(pooled_var * (1 / n1 + 1 / n2))
+            else:
+                var1, var2 = m2[first] / (n1 - 1) / n1, m2[second] / (n2 - 1) / n2
+                dof = (var1 + var2) ** 2 / (var1 ** 2 / (n1 - 1) + var2 ** 2 / (n2 - 1))
+                standard_error = np.sqrt(var1 + var2)
+            t_statistic = (mean1 - mean2) / standard_error
+            cohens_d = (mean1 - mean2) / np.sqrt(pooled_var)
+        p_value = 2 * stats.t.sf(np.abs(t_statistic), dof)
+        hedges_g = cohens_d * (1 - 3 / (4 * dof_pooled - 1))
+
+        pairs, columns = len(first), len(value_columns)
+        results.append(pd.DataFrame({
+            'group_column': group_column,
+            'group1': np.repeat(np.asarray(groups, dtype=object)[first], columns),
+            'group2': np.repeat(np.asarray(groups, dtype=object)[second], columns),
+            'value_column': np.tile(np.asarray(value_columns, dtype=object), pairs),
+            'n1': n1.ravel().astype(int), 'n2': n2.ravel().astype(int),
+            'mean1': mean1.ravel(), 'mean2': mean2.ravel(),
+            't_statistic': t_statistic.ravel(), 'df': dof.ravel(), 'p_value': p_value.ravel(),
+            'cohens_d': cohens_d.ravel(), 'hedges_g': hedges_g.ravel(),
+        }))
+
+    columns = ['group_column', 'group1', 'group2', 'value_column', 'n1', 'n2', 'mean1', 'mean2',
+               't_statistic', 'df', 'p_value', 'cohens_d', 'hedges_g']
+    results = pd.concat(results, ignore_index=True) if results else pd.DataFrame(columns=columns)
+    results['p_bonferroni'] = adjust_p_values(results['p_value'], 'bonferroni')
+    results['p_fdr_bh'] = adjust_p_values(results['p_value'], 'fdr_bh')
+    return results
+
+def contingency_table(codes1, codes2, n_categories1, n_categories2):
+    """
+    Contingency table of two integer-coded columns from one bincount on the combined codes.
+    Rows with a missing value (code -1) in either column are dropped, and so are categories left without any row,
+    as pd.crosstab does.
+    """
+    valid = (codes1 >= 0) & (codes2 >= 0)
+    table = np.bincount(codes1[valid] * n_categories2 + codes2[valid], minlength=n_categories1 * n_categories2)
+    table = table.reshape(n_categories1, n_categories2)
+    return table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+
+def chi_square_statistics(table, min_expected=5):
+    """
+    Chi-square test of independence of a contingency table, as scipy.stats.chi2_contingency with Yates' correction
+    for 2x2 tables. Returns the statistic, p-value, degrees of freedom, Cramer's V (from the uncorrected statistic),
+    the smallest expected count and the fraction of expected counts below `min_expected`.
+    """
+    n = table.sum()
+    if table.shape[0] < 2 or table.shape[1] < 2:
+        return np.nan, np.nan, 0, np.nan, np.nan, np.nan
+    expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / n
+    dof = (table.shape[0] - 1) * (table.shape[1] - 1)
+    difference = table - expected
+    chi2 = np.sum(difference ** 2 / expected)
+    if dof == 1:
+        difference = np.sign(difference) * np.maximum(np.abs(difference) - 0.5, 0)
+        corrected = np.sum(difference ** 2 / expected)
+    else:
+        corrected = chi2
+    cramers_v = np.sqrt(chi2 / (n * (min(table.shape) - 1)))
+    return corrected, stats.chi2.sf(corrected, dof), dof, cramers_v, expected.min(), np.mean(expected < min_expected)
+
+def init_chi_square_worker(codes):
+    """
+    Give a worker process the integer codes of the categorical columns.
+    """
+    global _codes
+    _codes = codes
+
+def chi_square_shard(pairs, n_categories, min_expected=5):
+    """
+    Chi-square statistics of a list of column-position pairs; runs in a worker process or in this one.
+    """
+    return [chi_square_statistics(contingency_table(_codes[:, i], _codes[:, j], n_categories[i], n_categories[j]),
+                                  min_expected)
+            for i, j in pairs]
+
+def batch_chi_square_tests(df, columns, n_jobs=1, max_categories=100, min_expected=5):
+    """
+    Chi-square tests of independence for every pair of categorical columns.
+    Each column is factorized to integer codes once, and every contingency table is a bincount of combined codes.
+    Pairs are split across `n_jobs` worker processes. Columns with more than `max_categories` categories are skipped;
+    pass max_categories=None to test every column.
+    Returns one row per pair with the statistic, p-value, degrees of freedom, Cramer's V, the smallest expected count,
+    the fraction of expected counts below `min_expected`, a `low_expected` flag when that fraction exceeds 20% or any
+    expected count is below 1 (Cochran's rule), and Bonferroni and Benjamini-Hochberg adjusted p-values.
+    """
+    global _codes
+    kept, codes, n_categories = [], [], []
+    for column in columns:
+        column_codes, categories = pd.factorize(df[column])
+        if max_categories is not None and len(categories) > max_categories:
+            print(f"Skipping {column}: {len(categories)} categories is more than {max_categories}.")
+            continue
+        kept.append(column)
+        codes.append(column_codes)
+        n_categories.append(len(categories))
+    codes = np.column_stack(codes) if codes else np.empty((len(df), 0), dtype=np.intp)
+    pairs = [(i, j) for i in range(len(kept)) for j in range(i + 1, len(kept))]
+
+    if n_jobs > 1 and len(pairs) > 1:
+        with ProcessPoolExecutor(n_jobs, initializer=init_chi_square_worker, initargs=(codes,)) as executor:
+            futures = [executor.submit(chi_square_shard, shard, n_categories, min_expected)
+                       for shard in split_evenly(pairs, n_jobs)]
+            statistics = [result for future in futures for result in future.result()]
+    else:
+        init_chi_square_worker(codes)
+        try:
+            statistics = chi_square_shard(pairs, n_categories, min_expected)
+        finally:
+            _codes = None
+
+    results = pd.DataFrame(statistics, columns=['chi2', 'p_value', 'dof', 'cramers_v', 'min_expected',
+                                                'low_expected_fraction'])
+    results.insert(0, 'column1', [kept[i] for i, _ in pairs])
+    results.insert(1, 'column2', [kept[j] for _, j in pairs])
+    results['low_expected'] = (results['low_expected_fraction'] > 0.2) | (results['min_expected'] < 1)
+    results['p_bonferroni'] = adjust_p_values(results['p_value'], 'bonferroni')
+    results['p_fdr_bh'] = adjust_p_values(results['p_value'], 'fdr_bh')
+    return results
+
+def correlation_significance(correlation, n, method='pearson', confidence=0.95):
+    """
+    Two-sided p-values and confidence intervals of a matrix of correlation coefficients, given the matrix of
+    pairwise-complete row counts. P-values use the t distribution with n - 2 degrees of freedom, as scipy.stats.pearsonr
+    and spearmanr do. Intervals use the Fisher z transform, with standard error 1 / sqrt(n - 3) for Pearson and
+    sqrt(1.06 / (n - 3)) for Spearman (Fieller, Hartley and Pearson). Pairs with too few rows get NaN.
+    """
+    r = np.asarray(correlation, dtype='float64')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dof = np.where(n > 2, n - 2, np.nan)
+        t_statistic = r * np.sqrt(dof / ((1 - r) * (1 + r)))
+        p_value = 2 * stats.t.sf(np.abs(t_statistic), dof)
+        standard_error = np.sqrt((1.06 if method == 'spearman' else 1.0) / np.where(n > 3, n - 3, np.nan))
+        z = np.arctanh(r)
+        margin = stats.norm.ppf((1 + confidence) / 2) * standard_error
+        ci_low, ci_high = np.tanh(z - margin), np.tanh(z + margin)
+    return p_value, ci_low, ci_high
+
+def value_codes(values):
+    """
+    Code of every value of a column in the sorted order of its distinct values (-1 where missing), and the number
+    of distinct values. Average ranks over any subset of rows follow from the codes with one bincount (see
+    subset_ranks), so a column is sorted only once however many subsets it is ranked on.
+    """
+    present = ~np.isnan(values)
+    codes = np.full(len(values), -1, dtype=np.intp)
+    distinct, codes[present] = np.unique(values[present], return_inverse=True)
+    return codes, len(distinct)
+
+def subset_ranks(codes, n_distinct, rows):
+    """
+    Average ranks (ties share the mean of their positions, as DataFrame.rank) of a column's values on the selected
+    rows (a boolean mask or row positions), from its value codes.
+    """
+    codes = codes[rows]
+    counts = np.bincount(codes, minlength=n_distinct)
+    return (np.cumsum(counts) - (counts - 1) / 2)[codes]
+
+def scaled_ranks(codes, rows):
+    """
+    Average ranks of some columns (given by their value codes) on the selected rows, centred and scaled to unit
+    length so that the products of two such matrices are correlations.
+    """
+    rows = np.flatnonzero(rows)
+    ranks = np.empty((len(rows), len(codes)), order='F')
+    for position, column_codes in enumerate(codes):
+        ranks[:, position] = subset_ranks(*column_codes, rows)
+    # Average ranks of m values always sum to m (m + 1) / 2, whatever the ties
+    ranks -= (len(rows) + 1) / 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return ranks / np.sqrt(np.einsum('ij,ij->j', ranks, ranks))
+
+def spearman_with_counts(numbers, chunksize=100000):
+    """
+    Pairwise-complete Spearman correlation matrix of a numerical dataframe and its matrix of row counts, each pair
+    ranked on the rows where both columns are present, as DataFrame.corr(method='spearman') does.
+    Columns are grouped by their pattern of missing values. Pairs within a group share their complete rows, so every
+    column is ranked once over its non-missing values and the Pearson correlations of those ranks are exact for them.
+    Pairs of groups are then gathered by the rows complete in both: each distinct set of rows is ranked once, for
+    every group that meets it, and the cross correlations of each pair of groups are one matrix product.
+    """
+    columns = list(numbers.columns)
+    correlation, n = correlation_with_counts(numbers.rank(), columns, chunksize)
+    correlation, n = correlation.to_numpy(copy=True), np.array(n)
+    values = numbers.to_numpy(dtype='float64', na_value=np.nan)
+    packed = np.packbits(~np.isnan(values), axis=0)
+    # Columns grouped by a digest of their pattern of missing values
+    patterns = {}
+    for position in range(len(columns)):
+        patterns.setdefault(hashlib.blake2b(packed[:, position].tobytes(), digest_size=16).digest(), []).append(position)
+    members = [np.array(positions) for positions in patterns.values()]
+    if len(members) < 2:
+        return pd.DataFrame(correlation, index=columns, columns=columns), n
+
+    # Pairs of groups keyed by a digest of the rows complete in both, several pairs often sharing the same rows
+    packed = packed[:, [positions[0] for positions in members]].T
+    shared_rows = {}
+    for a in range(len(members) - 1):
+        for b, both in enumerate(packed[a] & packed[a + 1:], start=a + 1):
+            shared_rows.setdefault(hashlib.blake2b(both.tobytes(), digest_size=16).digest(), []).append((a, b))
+
+    codes = [value_codes(values[:, position]) for position in range(len(columns))]
+    for pairs in shared_rows.values():
+        a, b = pairs[0]
+        rows = np.unpackbits(packed[a] & packed[b], count=len(values)).astype(bool)
+        count = int(rows.sum())
+        # Every group meeting these rows is ranked on them once, and all their cross correlations are one product
+        used = sorted({g for pair in pairs for g in pair})
+        offsets = dict(zip(used, np.cumsum([0] + [len(members[g]) for g in used])))
+        if count >= 2:
+            ranks = scaled_ranks([codes[position] for g in used for position in members[g]], rows)
+            products = np.clip(ranks.T @ ranks, -1, 1)
+        for a, b in pairs:
+            block, mirrored = np.ix_(members[a], members[b]), np.ix_(members[b], members[a])
+            n[block] = count
+            correlation[block] = (products[offsets[a]:offsets[a] + len(members[a]), offsets[b]:offsets[b] + len(members[b])]
+                                  if count >= 2 else np.nan)
+            n[mirrored] = n[block].T
+            correlation[mirrored] = correlation[block].T
+    return pd.DataFrame(correlation, index=columns, columns=columns), n
+
+def correlation_matrices(df, columns=None, methods=('pearson', 'spearman'), confidence=0.95, chunksize=100000):
+    """
+    Pairwise-complete correlation matrices of the numerical columns: for each method, the coefficients, p-values and
+    confidence interval bounds as dataframes, plus the matrix 'n' of rows each pair was computed from.
+    Pearson coefficients come from the blocked accumulator in correlation.py, and Spearman coefficients from
+    spearman_with_counts, so both match DataFrame.corr on data with missing values.
+    """
+    if columns is None:
+        columns = df.select_dtypes(include=['number']).columns
+    columns = list(columns)
+    numbers = df[columns].apply(pd.to_numeric, errors='coerce')
+    matrices = {'n': pd.DataFrame(np.zeros((len(columns), len(columns)), dtype=int), index=columns, columns=columns)}
+    for method in methods:
+        if method not in ('pearson', 'spearman'):
+            raise ValueError(f"Unknown correlation method: {method}")
+        if method == 'spearman':
+            correlation, n = spearman_with_counts(numbers, chunksize)
+        else:
+            correlation, n = correlation_with_counts(numbers, columns, chunksize)
+        p_value, ci_low, ci_high = correlation_significance(correlation, n, method, confidence)
+        matrices['n'] = pd.DataFrame(n.astype(int), index=columns, columns=columns)
+        matrices[method] = {
+            'r': correlation,
+            'p_value': pd.DataFrame(p_value, index=columns, columns=columns),
+            'ci_low': pd.DataFrame(ci_low, index=columns, columns=columns),
+            'ci_high': pd.DataFrame(ci_high, index=columns, columns=columns),
+        }
+    return matrices
+
+def batch_correlation_tests(df, columns=None, methods=('pearson', 'spearman'), confidence=0.95, chunksize=100000):
+    """
+    Correlation tests of every pair of numerical columns, from the matrices of correlation_matrices.
+    Returns one row per pair with its row count and, for each method, the coefficient, p-value, confidence interval
+    and Bonferroni and Benjamini-Hochberg adjusted p-values.
+    """
+    matrices = correlation_matrices(df, columns, methods, confidence, chunksize)
+    columns = list(matrices['n'].columns)
+    first, second = np.triu_indices(len(columns), k=1)
+    results = pd.DataFrame({
+        'column1': np.asarray(columns, dtype=object)[first],
+        'column2': np.asarray(columns, dtype=object)[second],
+        'n': matrices['n'].to_numpy()[first, second],
+    })
+    for method in methods:
+        for statistic in ('r', 'p_value', 'ci_low', 'ci_high'):
+            results[f'{method}_{statistic}'] = matrices[method][statistic].to_numpy()[first, second]
+        results[f'{method}_p_bonferroni'] = adjust_p_values(results[f'{method}_p_value'], 'bonferroni')
+        results[f'{method}_p_fdr_bh'] = adjust_p_values(results[f'{method}_p_value'], 'fdr_bh')
+    return results
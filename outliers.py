@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+
+from sketches import (new_moments, new_quantile_sketch, query_median_absolute_deviation, query_quantiles,
+                      update_moments, update_quantile_sketch)
+
+# Outlier detection on numerical columns in two passes over chunks of rows. The first pass streams every column into
+# moments and a quantile sketch, from which the location and scale of each rule are read. The second pass flags the
+# rows of each chunk and packs the flags into bitmasks, one bit per row and column, so the flags of n rows and p
+# columns take n * p / 8 bytes.
+
+# Default threshold of each rule: z-scores beyond 3, robust z-scores (MAD scaled to a normal standard deviation)
+# beyond 3.5, and values more than 1.5 interquartile ranges outside the quartiles
+THRESHOLDS = {'zscore': 3, 'mad': 3.5, 'iqr': 1.5}
+# Scales the median absolute deviation of a normal distribution to its standard deviation
+MAD_SCALE = 1.4826
+
+def dataframe_chunks(df, chunksize=100000):
+    """
+    Consecutive chunks of at most `chunksize` rows of an in-memory dataframe.
+    """
+    return (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+
+def outlier_parameters(chunks, columns=None, rank_error=0.013):
+    """
+    Location and scale of every numerical column for each rule, from one pass over an iterable of dataframe chunks
+    (such as data_loader.iter_chunks). `columns` defaults to the numerical columns of the first chunk.
+    Means and standard deviations are exact; quartiles, medians and median absolute deviations come from a quantile
+    sketch with about `rank_error` normalized rank error. Returns a dataframe with one row per column.
+    """
+    moments, sketches = None, None
+    for chunk in chunks:
+        if moments is None:
+            if columns is None:
+                columns = chunk.select_dtypes(include=['number']).columns
+            columns = list(columns)
+            moments = {column: new_moments() for column in columns}
+            sketches = {column: new_quantile_sketch(rank_error) for column in columns}
+        values = chunk[columns].to_numpy(dtype='float64', na_value=np.nan)
+        for position, column in enumerate(columns):
+            moments[column] = update_moments(moments[column], values[:, position])
+            update_quantile_sketch(sketches[column], values[:, position])
+
+    parameters = {}
+    for column in (columns if moments is not None else []):
+        count = moments[column]['count']
+        q1, median, q3 = query_quantiles(sketches[column], [0.25, 0.5, 0.75])
+        parameters[column] = {
+            'count': count, 'mean': moments[column]['mean'],
+            'std': np.sqrt(moments[column]['m2'] / (count - 1)) if count > 1 else np.nan,
+            'median': median, 'mad': query_median_absolute_deviation(sketches[column], median),
+            'q1': q1, 'q3': q3,
+        }
+    return pd.DataFrame.from_dict(parameters, orient='index',
+                                  columns=['count', 'mean', 'std', 'median', 'mad', 'q1', 'q3'])
+
+def outlier_bounds(parameters, method='zscore', threshold=None):
+    """
+    Lower and upper bounds of the non-outlying values of every column under a rule: 'zscore', 'mad' or 'iqr'.
+    A column with zero or undefined scale has no outliers.
+    """
+    if method not in THRESHOLDS:
+        raise ValueError(f"Unknown outlier method: {method}")
+    threshold = THRESHOLDS[method] if threshold is None else threshold
+    if method == 'zscore':
+        center, scale = parameters['mean'], parameters['std']
+    elif method == 'mad':
+        center, scale = parameters['median'], MAD_SCALE * parameters['mad']
+    else:
+        center, scale = (parameters['q1'] + parameters['q3']) / 2, parameters['q3'] - parameters['q1']
+        # The fences sit half an interquartile range plus `threshold` of them from the middle of the box
+        threshold = threshold + 0.5
+    usable = (scale > 0).to_numpy()
+    lower = np.where(usable, center - threshold * scale, -np.inf)
+    upper = np.where(usable, center + threshold * scale, np.inf)
+    return lower, upper
+
+def pack_flags(flags, pending):
+    """
+    Pack the boolean flags of a chunk (rows, columns) into bytes per column, after the rows left over from the
+    previous chunk. Returns the packed bytes (columns, bytes) and the rows that do not fill a whole byte yet.
+    """
+    flags = np.concatenate([pending, flags])
+    whole = len(flags) // 8 * 8
+    return np.packbits(flags[:whole].T, axis=1), flags[whole:]
+
+def flag_outliers(chunks, parameters, method='zscore', threshold=None):
+    """
+    Flag the outliers of every column of `parameters` (see outlier_parameters) in a pass over dataframe chunks.
+    Missing values are not outliers. Returns a dict with the bitmask 'bits' (columns, ceil(rows / 8)) of packed
+    flags, the number of rows and the columns; see outlier_mask and outlier_counts to read it.
+    """
+    columns = list(parameters.index)
+    lower, upper = outlier_bounds(parameters, method, threshold)
+    pending = np.zeros((0, len(columns)), dtype=bool)
+    packed = []
+    n_rows = 0
+    for chunk in chunks:
+        values = chunk[columns].to_numpy(dtype='float64', na_value=np.nan)
+        with np.errstate(invalid='ignore'):
+            flags = (values < lower) | (values > upper)
+        bits, pending = pack_flags(flags, pending)
+        packed.append(bits)
+        n_rows += len(values)
+    packed.append(np.packbits(pending.T, axis=1))
+    return {'bits': np.concatenate(packed, axis=1), 'n_rows': n_rows, 'columns': columns}
+
+def outlier_mask(flags, column=None):
+    """
+    Boolean outlier flags of one column of a bitmask, or the rows flagged in any column when `column` is None.
+    """
+    if column is None:
+        if not flags['columns']:
+            return np.zeros(flags['n_rows'], dtype=bool)
+        bits = np.bitwise_or.reduce(flags['bits'], axis=0)
+    else:
+        bits = flags['bits'][flags['columns'].index(column)]
+    return np.unpackbits(np.asarray(bits, dtype=np.uint8), count=flags['n_rows']).astype(bool)
+
+def outlier_counts(flags):
+    """
+    Number of outliers flagged in each column of a bitmask.
+    """
+    counts = np.unpackbits(flags['bits'], axis=1).sum(axis=1)
+    return pd.Series(counts, index=flags['columns'], dtype='int64')
+
+def detect_outliers(df, method='zscore', threshold=None, columns=None, chunksize=100000, rank_error=0.013):
+    """
+    Outlier bitmask of the numerical columns of an in-memory dataframe under a rule (see flag_outliers).
+    """
+    parameters = outlier_parameters(dataframe_chunks(df, chunksize), columns, rank_error)
+    return flag_outliers(dataframe_chunks(df, chunksize), parameters, method, threshold)
+
+def isolation_forest_outliers(df, columns=None, contamination='auto', max_samples=256, n_estimators=100,
+                              n_jobs=None, random_state=0):
+    """
+    Multivariate outliers of the numerical columns by an isolation forest, fitted on subsamples of `max_samples`
+    complete rows. Rows with missing values are not scored and not flagged.
+    Returns a one-column bitmask named 'isolation_forest', read like those of flag_outliers.
+    """
+    if columns is None:
+        columns = df.select_dtypes(include=['number']).columns
+    values = df[list(columns)].to_numpy(dtype='float32', na_value=np.nan)
+    rows = ~np.isnan(values).any(axis=1)
+    flags = np.zeros(len(df), dtype=bool)
+    if rows.any():
+        forest = IsolationForest(n_estimators=n_estimators, max_samples=min(max_samples, int(rows.sum())),
+                                 contamination=contamination, n_jobs=n_jobs, random_state=random_state)
+        flags[rows] = forest.fit(values[rows]).predict(values[rows]) == -1
+    return {'bits': np.packbits(flags)[None, :], 'n_rows': len(df), 'columns': ['isolation_forest']}
@@ -0,0 +1,344 @@
+import io
+import math
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.colors import LogNorm
+
+from correlation import correlation_matrix, top_correlated
+from distribution_summaries import box_stats, distribution_summaries, group_summaries
+from kde import grouped_kde
+
+# Above this many rows, scatter plots are drawn as binned density images
+DENSITY_ROW_THRESHOLD = 200000
+# Heatmaps of more variables than this are drawn without cell annotations and grid lines
+HEATMAP_ANNOTATION_LIMIT = 30
+# Size in inches of the single-variable and heatmap figures, and resolution of rendered PNGs
+COLUMN_FIGURE_SIZE = (10, 6)
+HEATMAP_FIGURE_SIZE = (12, 10)
+PNG_DPI = 100
+# Bump whenever a change to the drawing code changes the rendered images, so cached PNGs are not reused
+RENDERER_VERSION = 1
+
+def use_density(df, density=None):
+    """
+    Whether to draw scatter plots of `df` as density images: as requested, or automatically for large datasets.
+    """
+    return len(df) > DENSITY_ROW_THRESHOLD if density is None else density
+
+def draw_density_scatter(ax, x, y, bins=200, sparse_count=1, highlight=None):
+    """
+    Draw a scatter plot as a 2D histogram image, so render time does not grow with the number of points.
+    Points are binned into a `bins` x `bins` grid and the cell counts drawn on a log colour scale.
+    Points in cells holding at most `sparse_count` points are still drawn as markers,
+    and points flagged in `highlight` are drawn in red.
+    """
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    highlight = np.zeros(len(x), dtype=bool) if highlight is None else np.asarray(highlight, dtype=bool)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x, y, highlight = x[valid], y[valid], highlight[valid]
+    if len(x) == 0:
+        return
+
+    # Cell of every point by arithmetic on the equal-width bins, then one bincount for the whole grid
+    x_low, x_width = x.min(), max(x.max() - x.min(), 1e-12)
+    y_low, y_width = y.min(), max(y.max() - y.min(), 1e-12)
+    x_cells = np.clip(((x - x_low) / x_width * bins).astype(np.intp), 0, bins - 1)
+    y_cells = np.clip(((y - y_low) / y_width * bins).astype(np.intp), 0, bins - 1)
+    counts = np.bincount(x_cells * bins + y_cells, minlength=bins * bins).reshape(bins, bins)
+    ax.imshow(np.ma.masked_equal(counts.T, 0), origin='lower', aspect='auto', cmap='viridis', norm=LogNorm(),
+              extent=(x_low, x_low + x_width, y_low, y_low + y_width), interpolation='nearest')
+
+    sparse = (counts[x_cells, y_cells] <= sparse_count) & ~highlight
+    ax.scatter(x[sparse], y[sparse], s=4, color='tab:blue')
+    ax.scatter(x[highlight], y[highlight], s=8, color='red')
+
+def draw_histogram(ax, summary, **kwargs):
+    """
+    Draw a histogram from the precomputed bin counts of a column summary.
+    """
+    if summary['count'] > 0:
+        edges = summary['bin_edges']
+        ax.hist(edges[:-1], bins=edges, weights=summary['bin_counts'], **kwargs)
+
+def draw_kde(ax, summary, **kwargs):
+    """
+    Draw the precomputed KDE of a column summary, scaled to the counts of its histogram.
+    """
+    if len(summary.get('kde_x', [])) > 0:
+        edges = summary['bin_edges']
+        ax.plot(summary['kde_x'], summary['kde_density'] * summary['count'] * (edges[1] - edges[0]), **kwargs)
+
+def histograms_figure(df, summaries=None):
+    """
+    Histograms of all numerical variables in one grid.
+    """
+    if summaries is None:
+        summaries = distribution_summaries(df)
+    n_columns = max(1, math.ceil(math.sqrt(len(summaries))))
+    n_rows = max(1, math.ceil(len(summaries) / n_columns))
+    fig, axes = plt.subplots(n_rows, n_columns, figsize=(15, 15), squeeze=False)
+    for ax, (column, summary) in zip(axes.flat, summaries.items()):
+        draw_histogram(ax, summary, edgecolor='black')
+        ax.set_title(column)
+        ax.grid(True)
+    for ax in axes.flat[len(summaries):]:
+        ax.set_visible(False)
+    plt.suptitle('Histograms of Numerical Features', fontsize=20)
+    return fig
+
+def box_plots_figure(df, summaries=None):
+    """
+    Box plots of all numerical variables side by side.
+    """
+    if summaries is None:
+        summaries = distribution_summaries(df)
+    fig = plt.figure(figsize=(15, 10))
+    plt.gca().bxp([box_stats(summary, column) for column, summary in summaries.items()])
+    plt.grid(True)
+    plt.title('Box plots of Numerical Features', fontsize=20)
+    plt.xticks(rotation=90)
+    return fig
+
+def column_histogram_figure(column, summary):
+    """
+    Histogram of one numerical variable with its KDE.
+    """
+    fig = plt.figure(figsize=COLUMN_FIGURE_SIZE)
+    draw_histogram(plt.gca(), summary, color=sns.color_palette()[0], alpha=0.75, edgecolor='white')
+    draw_kde(plt.gca(), summary, color=sns.color_palette()[0])
+    plt.title(f'Histogram of {column}', fontsize=15)
+    plt.xlabel(column)
+    plt.ylabel('Frequency')
+    return fig
+
+def column_box_plot_figure(column, summary):
+    """
+    Horizontal box plot of one numerical variable.
+    """
+    fig = plt.figure(figsize=COLUMN_FIGURE_SIZE)
+    boxes = plt.gca().bxp([box_stats(summary)], orientation='horizontal', patch_artist=True)
+    boxes['boxes'][0].set_facecolor(sns.color_palette()[0])
+    plt.yticks([])
+    plt.title(f'Box plot of {column}', fontsize=15)
+    plt.xlabel(column)
+    return fig
+
+def grouped_box_plot_figure(df, categorical_column, numerical_column, summaries=None):
+    """
+    Box plots of a numerical variable across the categories of another.
+    """
+    if summaries is None:
+        summaries = group_summaries(df, numerical_column, categorical_column)
+    stats = [box_stats(summary, category) for category, summary in zip(summaries['categories'], summaries['summaries'])]
+    fig = plt.figure(figsize=(12, 6))
+    boxes = plt.gca().bxp(stats, patch_artist=True)
+    for box, color in zip(boxes['boxes'], sns.color_palette('viridis', len(stats))):
+        box.set_facecolor(color)
+    plt.xlabel(categorical_column)
+    plt.ylabel(numerical_column)
+    plt.title(f'Box Plot of {numerical_column} by {categorical_column}', fontsize=15)
+    plt.xticks(rotation=45)
+    return fig
+
+def scatter_figure(df, x_column, y_column, density=None):
+    """
+    Scatter plot of a pair of numerical variables.
+    Large datasets are drawn as a density image (see use_density).
+    """
+    fig = plt.figure(figsize=(10, 7))
+    if use_density(df, density):
+        draw_density_scatter(plt.gca(), df[x_column], df[y_column])
+        plt.xlabel(x_column)
+        plt.ylabel(y_column)
+    else:
+        sns.scatterplot(x=x_column, y=y_column, data=df)
+    plt.title(f'Scatter Plot of {x_column} vs {y_column}', fontsize=15)
+    return fig
+
+def outlier_scatter_figure(df, x_column, y_column, outliers, density=None):
+    """
+    Scatter plot of a pair of numerical variables with the rows flagged in `outliers` highlighted in red.
+    Large datasets are drawn as a density image with the outliers as individual markers.
+    """
+    fig = plt.figure(figsize=(10, 7))
+    if use_density(df, density):
+        draw_density_scatter(plt.gca(), df[x_column], df[y_column], highlight=outliers)
+        plt.xlabel(x_column)
+        plt.ylabel(y_column)
+    else:
+        sns.scatterplot(x=x_column, y=y_column, data=df, hue=outliers, palette={True: 'red', False: 'blue'})
+    plt.title(f'Scatter Plot of {x_column} vs {y_column} with Outliers Highlighted', fontsize=15)
+    return fig
+
+def sample_rows(df, max_points, stratify=None, random_state=0):
+    """
+    Positions of at most `max_points` rows drawn uniformly without replacement, in their original order.
+    With `stratify`, each category of that column keeps its share of the sample.
+    """
+    if len(df) <= max_points:
+        return np.arange(len(df))
+    if stratify is None:
+        return np.sort(np.random.default_rng(random_state).choice(len(df), max_points, replace=False))
+    positions = pd.Series(np.arange(len(df)), index=df.index)
+    sample = positions.groupby(df[stratify].to_numpy(), dropna=False).sample(frac=max_points / len(df), random_state=random_state)
+    return np.sort(sample.to_numpy())
+
+def diagonal_densities(x, diag_kind='kde', bins=20):
+    """
+    Densities of every column of the matrix `x` for the diagonal of a pair plot, computed in one vectorized pass:
+    a batched KDE with one group per column, or histograms from a single bincount. Returns (grids, densities);
+    for histograms the grids hold the bin edges.
+    """
+    n, p = x.shape
+    codes = np.repeat(np.arange(p), n)
+    values = x.T.ravel()
+    with np.errstate(invalid='ignore'):
+        lows, highs = np.nanmin(x, axis=0), np.nanmax(x, axis=0)
+    widths = np.where(highs > lows, highs - lows, 1.0)
+    if diag_kind == 'kde':
+        # Rescale every column to [0, 1] so they share the KDE bin grid, then map the curves back
+        grids, densities = grouped_kde((values - lows[codes]) / widths[codes], codes, p)
+        return lows[:, None] + grids * widths[:, None], densities / widths[:, None]
+
+    valid = ~np.isnan(values)
+    cells = np.clip(((values[valid] - lows[codes[valid]]) / widths[codes[valid]] * bins).astype(np.intp), 0, bins - 1)
+    counts = np.bincount(codes[valid] * bins + cells, minlength=p * bins).reshape(p, bins)
+    edges = lows[:, None] + widths[:, None] * np.linspace(0, 1, bins + 1)[None, :]
+    return edges, counts
+
+def pairplot_figure(df, columns, diag_kind='auto', density=None, max_points=5000, stratify=None, top_k=None,
+                    random_state=0):
+    """
+    Pair plot of the given numerical columns, drawn as one grid of axes.
+    Off-diagonal panels show at most `max_points` subsampled rows (see sample_rows), or with `density` (automatic
+    for large datasets, see use_density) binned density images of every row. Diagonal panels show KDEs
+    (diag_kind 'kde') or histograms of every row, computed for all columns at once (see diagonal_densities).
+    With `top_k`, only the most correlated variables are shown (see correlation.top_correlated).
+    """
+    columns = list(columns)
+    if top_k is not None and len(columns) > top_k:
+        columns = list(top_correlated(correlation_matrix(df, columns), top_k).index)
+    x = df[columns].to_numpy(dtype='float64', na_value=np.nan)
+    p = len(columns)
+    dense = use_density(df, density)
+    sample = x[sample_rows(df, max_points, stratify, random_state)]
+    grids, densities = diagonal_densities(x, 'kde' if diag_kind == 'kde' else 'hist')
+
+    fig, axes = plt.subplots(p, p, figsize=(2.5 * p, 2.5 * p), sharex='col', squeeze=False)
+    for i in range(p):
+        for j in range(p):
+            ax = axes[i, j]
+            if i == j:
+                if diag_kind == 'kde':
+                    ax.fill_between(grids[i], densities[i], alpha=0.25)
+                    ax.plot(grids[i], densities[i])
+                else:
+                    ax.stairs(densities[i], grids[i], fill=True, alpha=0.75)
+                ax.set_yticks([])
+            elif dense:
+                draw_density_scatter(ax, x[:, j], x[:, i], bins=100)
+            else:
+                ax.scatter(sample[:, j], sample[:, i], s=5, alpha=0.6)
+            if i == p - 1:
+                ax.set_xlabel(columns[j])
+            if j == 0:
+                ax.set_ylabel(columns[i])
+            elif i != j:
+                ax.tick_params(labelleft=False)
+    fig.tight_layout()
+    return fig
+
+def correlation_heatmap_figure(df, top_k=None):
+    """
+    Correlation heatmap of the numerical variables, limited to the `top_k` most correlated ones if given.
+    """
+    return heatmap_figure(correlation_matrix(df), top_k)
+
+def heatmap_figure(correlation, top_k=None):
+    """
+    Heatmap of a precomputed correlation matrix.
+    With `top_k`, only the variables with the strongest correlations are shown, reordered so correlated variables
+    sit together (see correlation.top_correlated).
+    """
+    title = 'Correlation Heatmap'
+    if top_k is not None and len(correlation) > top_k:
+        correlation = top_correlated(correlation, top_k)
+        title = f'Correlation Heatmap (top {top_k} variables)'
+    annotate = len(correlation) <= HEATMAP_ANNOTATION_LIMIT
+
+    fig = plt.figure(figsize=HEATMAP_FIGURE_SIZE)
+    sns.heatmap(correlation, annot=annotate, fmt='.2f', cmap='coolwarm', square=True,
+                linewidths=.5 if annotate else 0)
+    plt.title(title, fontsize=20)
+    return fig
+
+def violin_figure(df, categorical_column, numerical_column, summaries=None):
+    """
+    Violin plot of a numerical variable across the categories of another, drawn from the precomputed group KDEs
+    and box-plot statistics. Widths are proportional to density across all violins, as seaborn's density_norm='area'.
+    """
+    if summaries is None:
+        summaries = group_summaries(df, numerical_column, categorical_column)
+    categories = summaries['categories']
+    drawn = [k for k, summary in enumerate(summaries['summaries']) if len(summary.get('kde_x', [])) > 0]
+    peak = max((summaries['summaries'][k]['kde_density'].max() for k in drawn), default=1)
+
+    fig = plt.figure(figsize=(12, 6))
+    ax = plt.gca()
+    if drawn:
+        stats = [{'coords': summaries['summaries'][k]['kde_x'], 'vals': summaries['summaries'][k]['kde_density'],
+                  'mean': summaries['summaries'][k]['mean'], 'median': summaries['summaries'][k]['median'],
+                  'min': summaries['summaries'][k]['kde_x'][0], 'max': summaries['summaries'][k]['kde_x'][-1]}
+                 for k in drawn]
+        widths = [0.8 * summaries['summaries'][k]['kde_density'].max() / peak for k in drawn]
+        bodies = ax.violin(stats, positions=drawn, widths=widths, showextrema=False)
+        colors = sns.color_palette('viridis', len(categories))
+        for body, k in zip(bodies['bodies'], drawn):
+            body.set_facecolor(colors[k])
+            body.set_edgecolor('black')
+            body.set_alpha(1)
+
+    # Inner box: whiskers, interquartile range and a white median marker
+    boxed = [k for k, summary in enumerate(summaries['summaries']) if summary['count'] > 0]
+    box = [summaries['summaries'][k] for k in boxed]
+    ax.vlines(boxed, [s['whislo'] for s in box], [s['whishi'] for s in box], color='0.25', linewidth=1.5)
+    ax.vlines(boxed, [s['q1'] for s in box], [s['q3'] for s in box], color='0.25', linewidth=5)
+    ax.scatter(boxed, [s['median'] for s in box], color='white', s=15, zorder=3)
+
+    ax.set_xticks(range(len(categories)), [str(category) for category in categories])
+    ax.set_xlim(-0.5, len(categories) - 0.5)
+    plt.xlabel(categorical_column)
+    plt.ylabel(numerical_column)
+    plt.title(f'Violin Plot of {numerical_column} by {categorical_column}', fontsize=15)
+    plt.xticks(rotation=45)
+    return fig
+
+def figure_png(fig):
+    """
+    Render a figure to PNG bytes in memory and release it.
+    """
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=PNG_DPI)
+    plt.close(fig)
+    return buffer.getvalue()
+
+def render_parameters(figsize):
+    """
+    Everything besides the data that determines a rendered PNG: figure size, resolution and renderer version.
+    """
+    return {'figsize': tuple(figsize), 'dpi': PNG_DPI, 'renderer': (RENDERER_VERSION, matplotlib.__version__)}
+
+def finish_figure(fig, output_path=None):
+    """
+    Show the figure interactively, or save it to `output_path` and release it.
+    """
+    if output_path is None:
+        plt.show()
+    else:
+        fig.savefig(output_path)
+        plt.close(fig)
@@ -0,0 +1,191 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Permutation and bootstrap tests. Resamples are drawn a batch at a time as (batch, rows) index or label arrays and the
+# statistic of a whole batch is evaluated with array operations. Batch i always draws from the i-th child of one
+# SeedSequence, and batches are consumed in order, so results depend on the seed but not on the number of processes.
+
+# Each batch holds at most this many resampled values
+BATCH_ELEMENTS = 2 ** 22
+
+# Data of the test in progress, set once per worker process by init_worker: (first, second, strata)
+_data = None
+
+def mean_difference(values, labels):
+    """
+    Difference between the mean of `values` where `labels` is 1 and where it is 0, for each row of a batch.
+    """
+    n1 = labels.sum(axis=-1)
+    total = np.broadcast_to(values, labels.shape).sum(axis=-1)
+    sum1 = np.sum(values * labels, axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sum1 / n1 - (total - sum1) / (labels.shape[-1] - n1)
+
+def correlation(x, y):
+    """
+    Pearson correlation of `x` and `y` for each row of a batch.
+    """
+    x = x - x.mean(axis=-1, keepdims=True)
+    y = y - y.mean(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.sum(x * y, axis=-1) / np.sqrt(np.sum(x ** 2, axis=-1) * np.sum(y ** 2, axis=-1))
+
+def chi_square(codes1, codes2):
+    """
+    Pearson chi-square statistic (without Yates' correction) of the contingency table of two integer-coded arrays,
+    for each row of a batch. The tables of the whole batch come from one bincount; categories absent from a row's
+    resample contribute nothing.
+    """
+    codes1, codes2 = np.broadcast_arrays(np.atleast_2d(codes1), np.atleast_2d(codes2))
+    batch, n = codes1.shape
+    k1, k2 = int(codes1.max()) + 1, int(codes2.max()) + 1
+    flat = (np.arange(batch)[:, None] * k1 + codes1) * k2 + codes2
+    tables = np.bincount(flat.ravel(), minlength=batch * k1 * k2).reshape(batch, k1, k2)
+    expected = tables.sum(axis=2)[:, :, None] * tables.sum(axis=1)[:, None, :] / n
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cells = np.where(expected > 0, (tables - expected) ** 2 / expected, 0)
+    return cells.sum(axis=(1, 2))
+
+STATISTICS = {
+    'mean_difference': mean_difference,
+    'correlation': correlation,
+    'chi_square': chi_square,
+}
+
+def statistic_inputs(df, col1, col2, statistic):
+    """
+    The two arrays a statistic is computed from, over the rows where both columns are present.
+    'mean_difference' compares the numerical column `col2` between the two groups of `col1` (first group minus second,
+    in order of appearance), 'correlation' takes two numerical columns and 'chi_square' two categorical columns.
+    """
+    both = df[[col1, col2]].dropna()
+    if statistic == 'mean_difference':
+        codes, groups = pd.factorize(both[col1])
+        if len(groups) != 2:
+            raise ValueError(f"A difference of means requires exactly 2 groups. Found {len(groups)} groups in {col1}.")
+        return both[col2].to_numpy(dtype='float64'), (codes == 0).astype('float64')
+    if statistic == 'correlation':
+        return both[col1].to_numpy(dtype='float64'), both[col2].to_numpy(dtype='float64')
+    if statistic == 'chi_square':
+        return pd.factorize(both[col1])[0], pd.factorize(both[col2])[0]
+    raise ValueError(f"Unknown statistic: {statistic}")
+
+def init_worker(first, second, strata=None):
+    """
+    Give a worker process the data of the test in progress.
+    """
+    global _data
+    _data = (first, second, strata)
+
+def permutation_batch(statistic, seed, size):
+    """
+    Statistic of `size` random permutations of the second array against the first;
+    runs in a worker process or in this one.
+    """
+    first, second, _ = _data
+    shuffled = np.random.default_rng(seed).permuted(np.tile(second, (size, 1)), axis=1)
+    return STATISTICS[statistic](first, shuffled)
+
+def bootstrap_batch(statistic, seed, size):
+    """
+    Statistic of `size` bootstrap resamples of the rows; runs in a worker process or in this one.
+    With strata, given as (row order, stratum start, stratum size) per sorted position, rows are resampled within
+    their stratum so every resample keeps the stratum sizes.
+    """
+    first, second, strata = _data
+    uniform = np.random.default_rng(seed).random((size, len(first)))
+    if strata is None:
+        rows = (uniform * len(first)).astype(np.intp)
+    else:
+        order, starts, sizes = strata
+        rows = order[starts + (uniform * sizes).astype(np.intp)]
+    return STATISTICS[statistic](first[rows], second[rows])
+
+def run_batches(batch, statistic, first, second, strata, n_resamples, seed, n_jobs, stop=None):
+    """
+    Evaluate `n_resamples` resampled statistics in batches, with batch i seeded from the i-th child of `seed`.
+    Batches run in this process or on `n_jobs` worker processes; after each batch, in order, `stop` is called with the
+    statistics so far and ends the run early when it returns True. Returns the concatenated statistics.
+    """
+    global _data
+    batch_size = max(1, min(n_resamples, BATCH_ELEMENTS // max(len(first), 1)))
+    sizes = [min(batch_size, n_resamples - start) for start in range(0, n_resamples, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    results = []
+
+    def finished():
+        return stop is not None and stop(np.concatenate(results))
+
+    if n_jobs > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(n_jobs, initializer=init_worker, initargs=(first, second, strata)) as executor:
+            for start in range(0, len(sizes), n_jobs):
+                futures = [executor.submit(batch, statistic, seeds[i], sizes[i])
+                           for i in range(start, min(start + n_jobs, len(sizes)))]
+                for future in futures:
+                    results.append(future.result())
+                    if finished():
+                        for pending in futures:
+                            pending.cancel()
+                        return np.concatenate(results)
+    else:
+        init_worker(first, second, strata)
+        try:
+            for i in range(len(sizes)):
+                results.append(batch(statistic, seeds[i], sizes[i]))
+                if finished():
+                    break
+        finally:
+            _data = None
+    return np.concatenate(results) if results else np.empty(0)
+
+def permutation_test(first, second, statistic, n_resamples=9999, alternative='two-sided', precision=None,
+                     seed=0, n_jobs=1):
+    """
+    Permutation test of a statistic in STATISTICS, permuting `second` against `first`.
+    The p-value is (1 + resamples at least as extreme as observed) / (1 + resamples). With `precision`, resampling stops
+    early once the Monte Carlo standard error of the p-value is below it.
+    Returns the observed statistic, the p-value, the number of resamples used and the standard error of the p-value.
+    """
+    first, second = np.asarray(first), np.asarray(second)
+    observed = float(np.squeeze(STATISTICS[statistic](first, second)))
+    # Allow for rounding, so resamples equal to the observed statistic count as at least as extreme
+    tolerance = 1e-12 * max(abs(observed), 1)
+
+    def extreme(statistics):
+        if alternative == 'two-sided':
+            return np.abs(statistics) >= abs(observed) - tolerance
+        if alternative == 'greater':
+            return statistics >= observed - tolerance
+        if alternative == 'less':
+            return statistics <= observed + tolerance
+        raise ValueError(f"Unknown alternative: {alternative}")
+
+    def p_value(statistics):
+        p = (1 + np.count_nonzero(extreme(statistics))) / (1 + len(statistics))
+        return p, float(np.sqrt(p * (1 - p) / (1 + len(statistics))))
+
+    stop = (lambda statistics: p_value(statistics)[1] < precision) if precision is not None else None
+    statistics = run_batches(permutation_batch, statistic, first, second, None, n_resamples, seed, n_jobs, stop)
+    p, standard_error = p_value(statistics)
+    return {'statistic': observed, 'p_value': p, 'n_resamples': len(statistics), 'standard_error': standard_error}
+
+def bootstrap(first, second, statistic, n_resamples=9999, confidence=0.95, strata=None, seed=0, n_jobs=1):
+    """
+    Bootstrap distribution of a statistic in STATISTICS, resampling rows of (first, second) with replacement,
+    within the groups given by the integer array `strata` if any. Returns the observed statistic, the bootstrap
+    standard error and the percentile confidence interval; resamples where the statistic is undefined are ignored.
+    """
+    first, second = np.asarray(first), np.asarray(second)
+    observed = float(np.squeeze(STATISTICS[statistic](first, second)))
+    if strata is not None:
+        order = np.argsort(strata, kind='stable')
+        _, starts, sizes = np.unique(np.asarray(strata)[order], return_index=True, return_counts=True)
+        strata = (order, np.repeat(starts, sizes), np.repeat(sizes, sizes))
+    statistics = run_batches(bootstrap_batch, statistic, first, second, strata, n_resamples, seed, n_jobs)
+    statistics = statistics[~np.isnan(statistics)]
+    tail = (1 - confidence) / 2 * 100
+    ci_low, ci_high = np.percentile(statistics, [tail, 100 - tail]) if len(statistics) else (np.nan, np.nan)
+    return {'statistic': observed, 'standard_error': float(np.std(statistics, ddof=1)) if len(statistics) > 1 else np.nan,
+            'ci_low': float(ci_low), 'ci_high': float(ci_high), 'n_resamples': len(statistics)}
@@ -0,0 +1,58 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from data_loader import CACHE_DIR
+
+SECTION_CACHE_DIR = os.path.join(CACHE_DIR, 'sections')
+# Bump whenever the content or layout of a cached section changes, so older cache entries are not reused
+SECTION_FORMAT_VERSION = 1
+
+def column_hashes(df, columns):
+    """
+    Content hash of each column, covering its name, dtype and values.
+    """
+    hashes = {}
+    for column in columns:
+        key = hashlib.blake2b(digest_size=16)
+        key.update(repr((column, str(df[column].dtype))).encode())
+        key.update(pd.util.hash_pandas_object(df[column], index=False).to_numpy().tobytes())
+        hashes[column] = key.hexdigest()
+    return hashes
+
+def section_key(kind, input_hashes, **params):
+    """
+    Content address of a report section: the section format version, its kind, the hashes of its input columns and
+    its parameters.
+    """
+    key = hashlib.blake2b(digest_size=16)
+    key.update(repr((SECTION_FORMAT_VERSION, kind, list(input_hashes), sorted(params.items()))).encode())
+    return key.hexdigest()
+
+def load_section(key, extension, cache_dir=SECTION_CACHE_DIR):
+    """
+    Read a cached section, or return None when it is not cached.
+    '.json' sections hold lines of text; any other extension holds raw bytes such as a PNG.
+    """
+    if cache_dir is None:
+        return None
+    path = os.path.join(cache_dir, key + extension)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        content = f.read()
+    return json.loads(content) if extension == '.json' else content
+
+def save_section(key, extension, content, cache_dir=SECTION_CACHE_DIR):
+    """
+    Cache a section under its key, writing to a temporary name first so an interrupted run leaves no partial file.
+    """
+    if cache_dir is None:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, key + extension)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(json.dumps(content).encode() if extension == '.json' else content)
+    os.replace(path + '.tmp', path)
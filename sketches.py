@@ -0,0 +1,281 @@
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+# Quantile sketch (KLL): a stack of compactors, where an item at level h stands for 2**h input values.
+# With parameter k the normalized rank error is about 2.3 / k**0.97, e.g. 1.3% for k = 200.
+
+def new_quantile_sketch(rank_error=0.013):
+    """
+    Create an empty quantile sketch whose normalized rank error is about `rank_error`.
+    """
+    k = max(8, int(math.ceil((2.296 / rank_error) ** (1 / 0.9723))))
+    return {'type': 'quantiles', 'k': k, 'n': 0, 'min': math.inf, 'max': -math.inf, 'levels': [np.empty(0)]}
+
+def level_capacity(k, n_levels, level):
+    """
+    Capacity of a compactor: k at the top level, shrinking by 2/3 for each level below it.
+    """
+    return max(2, int(math.ceil(k * (2 / 3) ** (n_levels - level - 1))))
+
+def compress_quantile_sketch(sketch):
+    """
+    Compact every level above its capacity: sort it and promote every other item, from a random offset, one level up.
+    """
+    levels = sketch['levels']
+    level = 0
+    while level < len(levels):
+        if len(levels[level]) > level_capacity(sketch['k'], len(levels), level):
+            if level + 1 == len(levels):
+                levels.append(np.empty(0))
+            items = np.sort(levels[level])
+            n_pairs = len(items) // 2
+            # Seeded from the sketch state so results are reproducible, including after a round trip through JSON
+            offset = np.random.default_rng([sketch['n'], level]).integers(2)
+            levels[level + 1] = np.concatenate([levels[level + 1], items[offset:2 * n_pairs:2]])
+            levels[level] = items[2 * n_pairs:]
+        level += 1
+
+def update_quantile_sketch(sketch, values):
+    """
+    Add the non-missing values of an array to a quantile sketch.
+    """
+    x = np.asarray(values, dtype='float64')
+    x = x[~np.isnan(x)]
+    if len(x) == 0:
+        return sketch
+    sketch['n'] += len(x)
+    sketch['min'] = min(sketch['min'], float(x.min()))
+    sketch['max'] = max(sketch['max'], float(x.max()))
+    sketch['levels'][0] = np.concatenate([sketch['levels'][0], x])
+    compress_quantile_sketch(sketch)
+    return sketch
+
+def merge_quantile_sketches(left, right):
+    """
+    Merge two quantile sketches into a new one that summarises both inputs.
+    """
+    merged = {'type': 'quantiles', 'k': min(left['k'], right['k']), 'n': left['n'] + right['n'],
+              'min': min(left['min'], right['min']), 'max': max(left['max'], right['max']), 'levels': []}
+    for level in range(max(len(left['levels']), len(right['levels']))):
+        parts = [sketch['levels'][level] for sketch in (left, right) if level < len(sketch['levels'])]
+        merged['levels'].append(np.concatenate(parts))
+    compress_quantile_sketch(merged)
+    return merged
+
+def query_quantiles(sketch, quantiles):
+    """
+    Estimate the given quantiles; the 0 and 1 quantiles are the exact minimum and maximum.
+    """
+    if sketch['n'] == 0:
+        return np.full(len(quantiles), np.nan)
+    items = np.concatenate(sketch['levels'])
+    weights = np.concatenate([np.full(len(level_items), 2.0 ** level) for level, level_items in enumerate(sketch['levels'])])
+    order = np.argsort(items, kind='stable')
+    items, cumulative = items[order], np.cumsum(weights[order])
+    positions = np.searchsorted(cumulative, np.asarray(quantiles) * cumulative[-1], side='left')
+    estimates = items[np.minimum(positions, len(items) - 1)]
+    return np.where(np.asarray(quantiles) <= 0, sketch['min'],
+                    np.where(np.asarray(quantiles) >= 1, sketch['max'], estimates))
+
+def query_median_absolute_deviation(sketch, center):
+    """
+    Estimate the median absolute deviation of the sketched values from `center`, from the same weighted items
+    query_quantiles uses, so it needs no second pass over the data.
+    """
+    if sketch['n'] == 0:
+        return np.nan
+    items = np.concatenate(sketch['levels'])
+    weights = np.concatenate([np.full(len(level_items), 2.0 ** level) for level, level_items in enumerate(sketch['levels'])])
+    deviations = np.abs(items - center)
+    order = np.argsort(deviations, kind='stable')
+    cumulative = np.cumsum(weights[order])
+    return float(deviations[order][min(np.searchsorted(cumulative, 0.5 * cumulative[-1]), len(items) - 1)])
+
+# Distinct-count sketch (HyperLogLog): 2**p registers, relative standard error 1.04 / sqrt(2**p).
+
+def new_distinct_sketch(relative_error=0.01):
+    """
+    Create an empty HyperLogLog sketch with about `relative_error` relative standard error.
+    """
+    p = min(18, max(4, int(math.ceil(math.log2((1.04 / relative_error) ** 2)))))
+    return {'type': 'distinct', 'p': p, 'registers': np.zeros(2 ** p, dtype=np.uint8)}
+
+def bit_length(x):
+    """
+    Number of significant bits of each uint64, computed exactly on 32-bit halves.
+    """
+    high = (x >> np.uint64(32)).astype('float64')
+    low = (x & np.uint64(0xFFFFFFFF)).astype('float64')
+    with np.errstate(divide='ignore'):
+        high_bits = np.where(high > 0, np.floor(np.log2(high)) + 33, 0)
+        low_bits = np.where(low > 0, np.floor(np.log2(low)) + 1, 0)
+    return np.where(high > 0, high_bits, low_bits).astype(np.uint8)
+
+def update_distinct_sketch(sketch, values):
+    """
+    Add the non-missing values of a Series to a HyperLogLog sketch.
+    Numbers are hashed as float64, so a column read as int in one partition and as float in another (because of a
+    missing value) counts 1 and 1.0 as one value when the sketches are merged.
+    """
+    values = pd.Series(values).dropna()
+    if len(values) == 0:
+        return sketch
+    p = sketch['p']
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        # Adding 0.0 also maps -0.0 to 0.0
+        hashes = pd.util.hash_array(values.to_numpy(dtype='float64') + 0.0)
+    else:
+        hashes = pd.util.hash_array(values.to_numpy())
+    index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+    remainder = hashes & np.uint64((1 << (64 - p)) - 1)
+    ranks = (64 - p + 1 - bit_length(remainder)).astype(np.uint8)
+    np.maximum.at(sketch['registers'], index, ranks)
+    return sketch
+
+def merge_distinct_sketches(left, right):
+    """
+    Merge two HyperLogLog sketches of the same precision.
+    """
+    return {'type': 'distinct', 'p': left['p'], 'registers': np.maximum(left['registers'], right['registers'])}
+
+def query_distinct(sketch):
+    """
+    Estimate the number of distinct values, with the small-range (linear counting) correction.
+    """
+    m = len(sketch['registers'])
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(2.0 ** -sketch['registers'].astype('float64'))
+    zeros = np.count_nonzero(sketch['registers'] == 0)
+    if estimate <= 2.5 * m and zeros > 0:
+        estimate = m * math.log(m / zeros)
+    return estimate
+
+# Heavy-hitters sketch (mergeable Misra-Gries): at most `capacity` counters; every count is a lower bound
+# that undercounts by at most `error`, which never exceeds n / (capacity + 1).
+
+def new_heavy_hitters_sketch(error=0.001):
+    """
+    Create an empty heavy-hitters sketch whose counts undercount by at most `error` times the number of values.
+    """
+    return {'type': 'heavy_hitters', 'capacity': int(math.ceil(1 / error)), 'n': 0, 'error': 0,
+            'counts': pd.Series(dtype='int64')}
+
+def reduce_heavy_hitters(sketch, counts):
+    """
+    Keep at most `capacity` counters by subtracting the (capacity + 1)-th largest count from all of them.
+    """
+    if len(counts) > sketch['capacity']:
+        cutoff = int(np.partition(counts.to_numpy(), len(counts) - sketch['capacity'] - 1)[len(counts) - sketch['capacity'] - 1])
+        counts = counts[counts > cutoff] - cutoff
+        sketch['error'] += cutoff
+    sketch['counts'] = counts.sort_values(ascending=False, kind='stable')
+    return sketch
+
+def update_heavy_hitters(sketch, values):
+    """
+    Add the non-missing values of a Series to a heavy-hitters sketch.
+    """
+    chunk_counts = pd.Series(values).value_counts()
+    chunk_counts = chunk_counts[chunk_counts > 0]
+    sketch['n'] += int(chunk_counts.sum())
+    counts = sketch['counts'].add(chunk_counts, fill_value=0).astype('int64')
+    return reduce_heavy_hitters(sketch, counts)
+
+def merge_heavy_hitters(left, right):
+    """
+    Merge two heavy-hitters sketches.
+    """
+    merged = {'type': 'heavy_hitters', 'capacity': min(left['capacity'], right['capacity']),
+              'n': left['n'] + right['n'], 'error': left['error'] + right['error']}
+    counts = left['counts'].add(right['counts'], fill_value=0).astype('int64')
+    return reduce_heavy_hitters(merged, counts)
+
+def query_heavy_hitters(sketch, top=None):
+    """
+    Most frequent values with their estimated counts, in decreasing order.
+    """
+    counts = sketch['counts']
+    return counts if top is None else counts.head(top)
+
+# Per-column sketches of a whole dataset, mergeable across partitions such as HABS waves.
+
+def new_moments():
+    """
+    Running count, mean and sum of squared deviations of a numerical column.
+    """
+    return {'type': 'moments', 'count': 0, 'mean': 0.0, 'm2': 0.0}
+
+def merge_moments(left, right):
+    """
+    Combine two sets of moments with the parallel (Chan et al.) update.
+    """
+    total = left['count'] + right['count']
+    if total == 0:
+        return new_moments()
+    delta = right['mean'] - left['mean']
+    return {'type': 'moments', 'count': total,
+            'mean': left['mean'] + delta * right['count'] / total,
+            'm2': left['m2'] + right['m2'] + delta ** 2 * left['count'] * right['count'] / total}
+
+def update_moments(moments, values):
+    """
+    Add the non-missing values of an array to a set of moments.
+    """
+    x = np.asarray(values, dtype='float64')
+    x = x[~np.isnan(x)]
+    if len(x) == 0:
+        return moments
+    mean = x.mean()
+    return merge_moments(moments, {'type': 'moments', 'count': len(x), 'mean': mean, 'm2': float(((x - mean) ** 2).sum())})
+
+def to_serializable(obj):
+    """
+    Convert sketches to JSON-compatible structures.
+    """
+    if isinstance(obj, dict):
+        return {'__dict__': [[to_serializable(key), to_serializable(value)] for key, value in obj.items()]}
+    if isinstance(obj, list):
+        return [to_serializable(item) for item in obj]
+    if isinstance(obj, np.ndarray):
+        return {'__array__': obj.tolist(), 'dtype': str(obj.dtype)}
+    if isinstance(obj, pd.Series):
+        return {'__series__': [to_serializable(key) for key in obj.index], 'counts': obj.tolist()}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return {'__float__': repr(obj)}
+    return obj
+
+def from_serializable(obj):
+    """
+    Rebuild sketches from the structures produced by to_serializable.
+    """
+    if isinstance(obj, list):
+        return [from_serializable(item) for item in obj]
+    if isinstance(obj, dict):
+        if '__dict__' in obj:
+            return {from_serializable(key): from_serializable(value) for key, value in obj['__dict__']}
+        if '__array__' in obj:
+            return np.array(obj['__array__'], dtype=obj['dtype'])
+        if '__series__' in obj:
+            return pd.Series(obj['counts'], index=[from_serializable(key) for key in obj['__series__']], dtype='int64')
+        if '__float__' in obj:
+            return float(obj['__float__'])
+    return obj
+
+def save_sketch(sketch, path):
+    """
+    Write sketches to a JSON file.
+    """
+    with open(path, 'w') as f:
+        json.dump(to_serializable(sketch), f)
+
+def load_sketch(path):
+    """
+    Read sketches written by save_sketch.
+    """
+    with open(path) as f:
+        return from_serializable(json.load(f))
@@ -0,0 +1,81 @@
+import os
+import runpy
+
+import pandas as pd
+import pytest
+
+from conftest import ROOT
+
+def load_script(name):
+    """
+    Functions of a numbered script, which cannot be imported by name.
+    """
+    return runpy.run_path(os.path.join(ROOT, name))
+
+@pytest.fixture
+def visit_csv(tmp_path):
+    """
+    A CSV whose Visit column reads as integers in the first chunks of 500 rows and as text in the last one.
+    """
+    path = tmp_path / 'visits.csv'
+    visits = ['1'] * 500 + ['2'] * 500 + ['3'] * 500 + ['BL'] * 500
+    pd.DataFrame({'Visit': visits, 'Score': range(2000)}).to_csv(path, index=False)
+    return str(path)
+
+def test_chunked_profile_counts_values_of_every_chunk(visit_csv):
+    script = load_script('1.Data_Understanding.py')
+    with pytest.warns(UserWarning, match='Visit'):
+        profile = script['profile_in_chunks'](visit_csv, chunksize=500)
+    assert profile['value_counts']['Visit'].to_dict() == {'1': 500, '2': 500, '3': 500, 'BL': 500}
+    assert profile['describe'].columns.tolist() == ['Score']
+
+def test_chunked_cleaning_handles_a_column_read_as_numbers_then_text(visit_csv, tmp_path):
+    frame = pd.read_csv(visit_csv, dtype=str)
+    frame.loc[10, 'Visit'] = None
+    frame.to_csv(visit_csv, index=False)
+    script = load_script('2.Data_Cleaning.py')
+    output_path = str(tmp_path / 'cleaned.csv')
+    script['run_cleaning_pipeline'](lambda: pd.read_csv(visit_csv, chunksize=500), output_path, n_jobs=1)
+
+    cleaned = pd.read_csv(output_path, dtype={'Visit': str})
+    # The mode counts the chunks read as numbers too: '2', the smallest of the values seen 500 times
+    assert cleaned.loc[10, 'Visit'] == '2'
+    assert cleaned['Visit'].value_counts().to_dict() == {'2': 501, '3': 500, 'bl': 500, '1': 499}
+
+def test_check_duplicates_returns_a_new_frame():
+    script = load_script('2.Data_Cleaning.py')
+    frame = pd.DataFrame({'ID': [1, 1, 2], 'Visit': ['BL', 'BL', 'BL']})
+    deduplicated = script['check_duplicates'](frame)
+    assert deduplicated['ID'].tolist() == [1, 2]
+    assert len(frame) == 3
+
+def test_sketched_chunked_profile_counts_values_of_every_chunk(visit_csv):
+    script = load_script('1.Data_Understanding.py')
+    with pytest.warns(UserWarning, match='Visit'):
+        profile = script['profile_in_chunks'](visit_csv, chunksize=500, approximate=True)
+    assert profile['value_counts']['Visit'].to_dict() == {'1': 500, '2': 500, '3': 500, 'BL': 500}
+    assert profile['describe'].columns.tolist() == ['Score']
+
+def test_chunked_profile_selects_the_same_categorical_columns_as_the_in_memory_one(tmp_path):
+    path = str(tmp_path / 'flags.csv')
+    pd.DataFrame({'Flag': [True, False] * 500, 'Visit': ['BL', 'M12'] * 500, 'Score': range(1000)}).to_csv(path, index=False)
+    script = load_script('1.Data_Understanding.py')
+    chunked = script['profile_in_chunks'](path, chunksize=300)
+    in_memory = script['profile_dataframe'](pd.read_csv(path))
+    assert chunked['categorical_columns'] == in_memory['categorical_columns'] == ['Visit']
+
+def test_chunked_cleaning_reads_twice_and_drops_duplicates_across_chunks(tmp_path):
+    frame = pd.DataFrame({'ID': [1, 2, 3, 1, 4, 2], 'Visit': ['BL', 'BL', None, 'BL', 'M12', 'BL']})
+    passes = []
+
+    def read_chunks():
+        passes.append(1)
+        return (frame.iloc[start:start + 2] for start in range(0, len(frame), 2))
+
+    script = load_script('2.Data_Cleaning.py')
+    output_path = str(tmp_path / 'cleaned.csv')
+    script['run_cleaning_pipeline'](read_chunks, output_path, n_jobs=1)
+    assert len(passes) == 2
+    cleaned = pd.read_csv(output_path)
+    assert cleaned['ID'].tolist() == [1, 2, 3, 4]
+    assert cleaned['Visit'].tolist() == ['bl', 'bl', 'bl', 'm12']
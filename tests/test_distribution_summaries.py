@@ -0,0 +1,9 @@
+import pandas as pd
+
+import distribution_summaries
+
+def test_cached_summaries_are_keyed_on_the_format_version(monkeypatch):
+    df = pd.DataFrame({'Score': [1.0, 2.0, 3.0]})
+    before = distribution_summaries.dataframe_fingerprint(df, ['Score'], 20)
+    monkeypatch.setattr(distribution_summaries, 'SUMMARY_FORMAT_VERSION', distribution_summaries.SUMMARY_FORMAT_VERSION + 1)
+    assert distribution_summaries.dataframe_fingerprint(df, ['Score'], 20) != before
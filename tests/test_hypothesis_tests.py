@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+
+from hypothesis_tests import correlation_matrices
+
+def test_spearman_reranks_pairs_whose_missing_values_differ():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(2000, 4)), columns=['a', 'b', 'c', 'd'])
+    df['b'] = (df['a'] + df['b']) ** 3
+    df['d'] = rng.integers(0, 5, len(df)).astype('float64')
+    for column in ['b', 'c', 'd']:
+        df.loc[rng.random(len(df)) < 0.2, column] = np.nan
+
+    matrices = correlation_matrices(df, methods=('spearman',))
+    expected = df.corr(method='spearman')
+    assert np.allclose(matrices['spearman']['r'].to_numpy(), expected.to_numpy())
+    assert (matrices['n'].to_numpy() == df.notna().astype(int).T.dot(df.notna().astype(int)).to_numpy()).all()
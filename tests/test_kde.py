@@ -0,0 +1,13 @@
+import numpy as np
+from scipy.stats import gaussian_kde
+
+from kde import grouped_kde
+
+def test_narrow_group_next_to_a_wide_one_is_resolved():
+    rng = np.random.default_rng(0)
+    narrow, wide = rng.normal(29.5, 0.05, 2000), rng.normal(20, 30, 2000)
+    codes = np.repeat([0, 1], [len(narrow), len(wide)])
+    grids, densities = grouped_kde(np.concatenate([narrow, wide]), codes, 2, cut=3)
+    for k, values in enumerate([narrow, wide]):
+        expected = gaussian_kde(values)(grids[k])
+        assert np.max(np.abs(densities[k] - expected)) < 0.01 * expected.max()
@@ -0,0 +1,16 @@
+import numpy as np
+import pandas as pd
+
+import sketches
+
+def test_distinct_sketches_merge_int_and_float_partitions():
+    ids = np.arange(1000)
+    # The second partition has a missing value, so it is read as float
+    int_partition = pd.Series(ids[:600])
+    float_partition = pd.Series(np.append(ids[400:].astype('float64'), np.nan))
+    assert int_partition.dtype == 'int64' and float_partition.dtype == 'float64'
+
+    left = sketches.update_distinct_sketch(sketches.new_distinct_sketch(), int_partition)
+    right = sketches.update_distinct_sketch(sketches.new_distinct_sketch(), float_partition)
+    merged = sketches.merge_distinct_sketches(left, right)
+    assert abs(sketches.query_distinct(merged) - 1000) < 30